@@ -1,14 +1,22 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
+from streamlit.errors import StreamlitAPIException
 from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import json
-from dataclasses import dataclass, asdict
+from dataclasses import asdict
 from typing import List, Dict
 import calendar
+import functools
+
+from lms import ConcurrentUpdateError, LeavePolicy, get_reference_cache, get_service, get_store, pages
+from lms.accrual import run_accrual, run_year_end
+from lms.availability import MonthlyAvailabilityCache, shift_month
+from lms.demo_data import seed_demo_data
+from lms.export import EXPORT_FORMATS
+from lms.figures import get_figure_cache
+from lms.metrics import get_metrics
+
+# pandas, NumPy and Plotly are imported inside the pages that chart or
+# analyse, so a new process renders its first page without loading them all
 
 # Page configuration
 st.set_page_config(
@@ -229,210 +237,135 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Data Classes
-@dataclass
-class LeavePolicy:
-    name: str
-    annual_days: int
-    sick_days: int
-    personal_days: int
-    carryover_limit: int
-    max_consecutive_days: int
-    min_notice_days: int
-
-@dataclass
-class Employee:
-    id: str
-    name: str
-    email: str
-    department: str
-    manager_id: str
-    policy: str
-    hire_date: datetime
-
-@dataclass
-class LeaveRequest:
-    id: str
-    employee_id: str
-    leave_type: str
-    start_date: datetime
-    end_date: datetime
-    days: float
-    reason: str
-    status: str
-    submitted_date: datetime
-    approver_id: str = None
-    approved_date: datetime = None
-    comments: str = ""
-
-# Initialize session state
-if 'leave_policies' not in st.session_state:
-    st.session_state.leave_policies = {
-        'Standard': LeavePolicy('Standard', 20, 10, 5, 5, 15, 7),
-        'Senior': LeavePolicy('Senior', 25, 12, 7, 10, 20, 5),
-        'Executive': LeavePolicy('Executive', 30, 15, 10, 15, 30, 3)
-    }
-
-if 'employees' not in st.session_state:
-    st.session_state.employees = [
-        Employee('E001', 'John Doe', 'john@company.com', 'Engineering', 'M001', 'Standard', datetime(2020, 1, 15)),
-        Employee('E002', 'Jane Smith', 'jane@company.com', 'Marketing', 'M002', 'Senior', datetime(2018, 3, 20)),
-        Employee('E003', 'Bob Johnson', 'bob@company.com', 'Engineering', 'M001', 'Standard', datetime(2021, 6, 1)),
-        Employee('E004', 'Alice Williams', 'alice@company.com', 'HR', 'M003', 'Senior', datetime(2019, 9, 10)),
-        Employee('E005', 'Charlie Brown', 'charlie@company.com', 'Sales', 'M002', 'Standard', datetime(2022, 2, 14)),
-        Employee('M001', 'Manager One', 'manager1@company.com', 'Engineering', 'CEO', 'Executive', datetime(2015, 1, 1)),
-        Employee('M002', 'Manager Two', 'manager2@company.com', 'Marketing', 'CEO', 'Executive', datetime(2016, 1, 1)),
-        Employee('M003', 'Manager Three', 'manager3@company.com', 'HR', 'CEO', 'Executive', datetime(2017, 1, 1)),
-    ]
+REQUESTS_PAGE_SIZE = 10
+CALENDAR_PAGE_SIZE = 20
 
-if 'leave_requests' not in st.session_state:
-    st.session_state.leave_requests = [
-        LeaveRequest('L001', 'E001', 'Annual Leave', datetime(2024, 2, 1), datetime(2024, 2, 5), 5, 'Family vacation', 'Approved', datetime(2024, 1, 15), 'M001', datetime(2024, 1, 16)),
-        LeaveRequest('L002', 'E002', 'Sick Leave', datetime(2024, 1, 10), datetime(2024, 1, 12), 3, 'Flu', 'Approved', datetime(2024, 1, 9), 'M002', datetime(2024, 1, 9)),
-        LeaveRequest('L003', 'E003', 'Annual Leave', datetime(2024, 3, 15), datetime(2024, 3, 20), 4, 'Vacation', 'Pending', datetime(2024, 1, 20)),
-        LeaveRequest('L004', 'E001', 'Personal Leave', datetime(2024, 2, 26), datetime(2024, 2, 27), 2, 'Personal matters', 'Pending', datetime(2024, 1, 25)),
-        LeaveRequest('L005', 'E004', 'Annual Leave', datetime(2024, 4, 1), datetime(2024, 4, 10), 8, 'Spring break', 'Approved', datetime(2024, 1, 28), 'M003', datetime(2024, 1, 29)),
-    ]
+# Persistent storage and reference data (policies, employees, holidays),
+# shared by every session in this process
+store = get_store()
+seed_demo_data(store)
+reference_cache = get_reference_cache(store)
+# Charts are reused across reruns and sessions while the data they plot is unchanged
+figures = get_figure_cache()
+# Opt-in timings of pages and service calls, shown to admins under Settings
+metrics = get_metrics()
 
-if 'holidays' not in st.session_state:
-    st.session_state.holidays = [
-        {'date': datetime(2024, 1, 1), 'name': "New Year's Day"},
-        {'date': datetime(2024, 7, 4), 'name': "Independence Day"},
-        {'date': datetime(2024, 12, 25), 'name': "Christmas Day"},
-        {'date': datetime(2024, 11, 28), 'name': "Thanksgiving"},
-    ]
+# One service holds the leave data for every session in this process and
+# catches up with writes from other sessions and processes as they happen
+service = get_service(store)
+service.refresh()
 
 if 'current_user' not in st.session_state:
     st.session_state.current_user = 'E001'
 
-if 'leave_balances' not in st.session_state:
-    st.session_state.leave_balances = {}
-    for emp in st.session_state.employees:
-        policy = st.session_state.leave_policies[emp.policy]
-        st.session_state.leave_balances[emp.id] = {
-            'Annual Leave': policy.annual_days,
-            'Sick Leave': policy.sick_days,
-            'Personal Leave': policy.personal_days,
-            'Used Annual': 0,
-            'Used Sick': 0,
-            'Used Personal': 0
-        }
-
 # Helper Functions
+def reference():
+    """Shared, read-only snapshot of policies, employees and holidays"""
+    return service.reference
+
 def get_employee(emp_id):
-    return next((emp for emp in st.session_state.employees if emp.id == emp_id), None)
+    return service.employee(emp_id)
 
 def get_employee_name(emp_id):
     emp = get_employee(emp_id)
     return emp.name if emp else "Unknown"
 
-def calculate_working_days(start_date, end_date):
-    """Calculate working days excluding weekends and holidays"""
-    days = 0
-    current = start_date
-    holiday_dates = [h['date'].date() for h in st.session_state.holidays]
-    
-    while current <= end_date:
-        if current.weekday() < 5 and current.date() not in holiday_dates:
-            days += 1
-        current += timedelta(days=1)
-    return days
+def timed_page(page):
+    """Record the page's render time under ``page.<name>`` while metrics are enabled"""
+    return metrics.instrument(f"page.{page.__name__}")(page)
 
-def check_team_coverage(employee_id, start_date, end_date):
-    """Check if leave would create coverage issues"""
-    emp = get_employee(employee_id)
-    team_members = [e for e in st.session_state.employees if e.department == emp.department and e.id != employee_id]
-    
-    overlapping_leaves = []
-    for leave in st.session_state.leave_requests:
-        if leave.status == 'Approved' and leave.employee_id in [tm.id for tm in team_members]:
-            if not (leave.end_date < start_date or leave.start_date > end_date):
-                overlapping_leaves.append(leave)
-    
-    coverage_percentage = 1 - (len(overlapping_leaves) / max(len(team_members), 1))
-    return coverage_percentage, overlapping_leaves
+def page_fragment(page):
+    """Run a page as a fragment, so its own widgets rerun just the page instead of the whole app.
 
-def analyze_sick_leave_patterns(employee_id):
-    """Analyze sick leave patterns for wellness interventions"""
-    sick_leaves = [lr for lr in st.session_state.leave_requests 
-                   if lr.employee_id == employee_id and lr.leave_type == 'Sick Leave']
-    
-    if not sick_leaves:
-        return {
-            'total_days': 0,
-            'frequency': 0,
-            'pattern': 'No pattern',
-            'alert_level': 'green'
-        }
-    
-    total_days = sum(lr.days for lr in sick_leaves)
-    frequency = len(sick_leaves)
-    
-    monday_friday_leaves = sum(1 for lr in sick_leaves 
-                               if lr.start_date.weekday() in [0, 4])
-    
-    alert_level = 'green'
-    pattern = 'Normal'
-    
-    if total_days > 8:
-        alert_level = 'red'
-        pattern = 'High frequency - wellness check recommended'
-    elif total_days > 5:
-        alert_level = 'yellow'
-        pattern = 'Moderate - monitor'
-    elif monday_friday_leaves > frequency * 0.6:
-        alert_level = 'yellow'
-        pattern = 'Weekend-adjacent pattern detected'
-    
-    return {
-        'total_days': total_days,
-        'frequency': frequency,
-        'pattern': pattern,
-        'alert_level': alert_level
-    }
+    A fragment rerun skips the top of the script, so the page picks up
+    changes made by other sessions itself.
+    """
+    @st.fragment
+    @timed_page
+    @functools.wraps(page)
+    def run():
+        service.refresh()
+        page()
+    return run
 
-def validate_leave_request(employee_id, leave_type, start_date, end_date):
-    """Validate leave request against policies"""
-    emp = get_employee(employee_id)
-    policy = st.session_state.leave_policies[emp.policy]
-    
-    errors = []
-    warnings = []
-    
-    days_until_leave = (start_date - datetime.now()).days
-    if days_until_leave < policy.min_notice_days:
-        warnings.append(f"Less than {policy.min_notice_days} days notice provided")
-    
-    leave_days = calculate_working_days(start_date, end_date)
-    if leave_days > policy.max_consecutive_days:
-        errors.append(f"Exceeds maximum consecutive days ({policy.max_consecutive_days})")
-    
-    balance = st.session_state.leave_balances.get(employee_id, {})
-    available = balance.get(leave_type, 0)
-    if leave_days > available:
-        errors.append(f"Insufficient {leave_type} balance (Available: {available}, Requested: {leave_days})")
-    
-    coverage, overlapping = check_team_coverage(employee_id, start_date, end_date)
-    if coverage < 0.5:
-        warnings.append(f"Low team coverage ({coverage*100:.0f}%) - {len(overlapping)} team members also on leave")
-    
-    return errors, warnings
+def rerun_page():
+    """Rerun just the current page, or the whole app when the page is running as part of a full run"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
-def update_leave_balance(employee_id, leave_type, days, operation='deduct'):
-    """Update employee leave balance"""
-    if employee_id not in st.session_state.leave_balances:
-        return
-    
-    balance = st.session_state.leave_balances[employee_id]
-    
-    if operation == 'deduct':
-        balance[leave_type] -= days
-        balance[f'Used {leave_type.split()[0]}'] += days
-    elif operation == 'restore':
-        balance[leave_type] += days
-        balance[f'Used {leave_type.split()[0]}'] -= days
+def render_cache(name, key, compute):
+    """``compute()``, kept in this session and reused by reruns until ``key`` changes"""
+    cached = st.session_state.get(name)
+    if cached is None or cached[0] != key:
+        st.session_state[name] = cached = (key, compute())
+    return cached[1]
+
+def data_key(*scope):
+    """Render cache key that changes with any write to the store or reference data"""
+    return (service.revision, service.reference_version) + scope
+
+def calendar_years():
+    """Years that have leave data, always including the current and next year"""
+    first, last = store.leave_date_range()
+    this_year = datetime.now().year
+    start = min(first.year, this_year) if first else this_year
+    end = max(last.year, this_year + 1) if last else this_year + 1
+    return list(range(start, end + 1))
+
+def forecast_chart(departments, title):
+    """Booked vs projected weekly availability for the next quarter"""
+    weekly = pages.availability_outlook(service, departments, datetime.now())
+    return figures.get('forecast', (weekly, title), lambda: build_forecast_chart(weekly, title))
+
+def build_forecast_chart(weekly, title):
+    """Line chart of a weekly booked/projected availability frame"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=weekly.index, y=weekly['Booked'], mode='lines+markers',
+                             name='Booked (approved)', line=dict(color='#2c5f7f', width=3)))
+    fig.add_trace(go.Scatter(x=weekly.index, y=weekly['Projected'], mode='lines+markers',
+                             name='Projected', line=dict(color='#6ba3c5', width=3, dash='dash')))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Week",
+        yaxis_title="Availability %",
+        yaxis=dict(range=[0, 105]),
+        height=350,
+        hovermode='x unified',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='#1a3a52'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+def submit_review(requests, status, approver_id, comments, message):
+    """Review requests from the Approvals page, then rerun just that page with the outcome"""
+    try:
+        service.review_requests(requests, status, approver_id, comments)
+        st.session_state.review_message = ('success', message)
+    except ConcurrentUpdateError:
+        st.session_state.review_message = (
+            'warning', "Another reviewer changed one of these requests first. Nothing was applied; "
+                       "the queue now shows the latest state.")
+    rerun_page()
+
+def report_download(label, file_stem, key, fmt='CSV', **scope):
+    """Download button that builds the report from the store when clicked"""
+    _, mime, extension = EXPORT_FORMATS[fmt]
+    st.download_button(
+        label,
+        lambda: pages.report_file(store, fmt, **scope),
+        f"{file_stem}.{extension}",
+        mime,
+        key=key
+    )
 
 # Main App
+@metrics.instrument('app.main')
 def main():
     # Professional header
     st.markdown("""
@@ -449,7 +382,7 @@ def main():
         # User selection
         current_user = st.selectbox(
             "👤 Current User",
-            options=[emp.id for emp in st.session_state.employees],
+            options=reference().employees.ids(),
             format_func=lambda x: get_employee_name(x),
             key='user_selector'
         )
@@ -467,7 +400,7 @@ def main():
         
         # Quick Stats
         st.subheader("📊 Leave Balance")
-        balance = st.session_state.leave_balances.get(current_user, {})
+        balance = service.balance(current_user)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -476,11 +409,14 @@ def main():
         with col2:
             st.metric("Personal", f"{balance.get('Personal Leave', 0):.0f}")
             
-        pending = sum(1 for lr in st.session_state.leave_requests 
-                     if lr.employee_id == current_user and lr.status == 'Pending')
+        pending = service.pending_count(current_user)
         if pending > 0:
             st.warning(f"⏳ {pending} pending request(s)")
         
+        next_leave = service.next_upcoming(current_user, datetime.now())
+        if next_leave:
+            st.caption(f"🗓️ Next leave: {next_leave.start_date.strftime('%b %d, %Y')}")
+        
         st.markdown("---")
         
         # Navigation
@@ -508,35 +444,32 @@ def main():
     elif page == "⚙️ Settings":
         show_settings()
 
+@timed_page
 def show_dashboard():
+    import pandas as pd
+    import plotly.graph_objects as go
+
     st.header("Dashboard Overview")
     
     current_user = st.session_state.current_user
     emp = get_employee(current_user)
-    balance = st.session_state.leave_balances.get(current_user, {})
+    overview = pages.dashboard(service, emp, datetime.now())
+    balance = overview['balance']
     
     # Top metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_balance = balance.get('Annual Leave', 0) + balance.get('Sick Leave', 0) + balance.get('Personal Leave', 0)
-        st.metric("Total Leave Balance", f"{total_balance:.0f} days")
+        st.metric("Total Leave Balance", f"{overview['total_balance']:.0f} days")
     
     with col2:
-        used_total = balance.get('Used Annual', 0) + balance.get('Used Sick', 0) + balance.get('Used Personal', 0)
-        st.metric("Leave Used (YTD)", f"{used_total:.0f} days")
+        st.metric("Leave Used (YTD)", f"{overview['used_total']:.0f} days")
     
     with col3:
-        pending_count = sum(1 for lr in st.session_state.leave_requests 
-                           if lr.employee_id == current_user and lr.status == 'Pending')
-        st.metric("Pending Requests", pending_count)
+        st.metric("Pending Requests", overview['pending_count'])
     
     with col4:
-        subordinates = [e for e in st.session_state.employees if e.manager_id == current_user]
-        pending_approvals = sum(1 for lr in st.session_state.leave_requests 
-                               if lr.status == 'Pending' and 
-                               any(e.id == lr.employee_id for e in subordinates))
-        st.metric("Pending Approvals", pending_approvals)
+        st.metric("Pending Approvals", overview['pending_approvals'])
     
     st.markdown("---")
     
@@ -555,40 +488,42 @@ def show_dashboard():
              'Used': balance.get('Used Personal', 0)},
         ])
         
-        fig = go.Figure()
-        fig.add_trace(go.Bar(
-            name='Available',
-            x=balance_data['Type'],
-            y=balance_data['Available'],
-            marker_color='#2c5f7f',
-            text=balance_data['Available'],
-            textposition='outside'
-        ))
-        fig.add_trace(go.Bar(
-            name='Used',
-            x=balance_data['Type'],
-            y=balance_data['Used'],
-            marker_color='#6ba3c5',
-            text=balance_data['Used'],
-            textposition='outside'
-        ))
-        
-        fig.update_layout(
-            barmode='group',
-            height=350,
-            margin=dict(l=0, r=0, t=30, b=0),
-            showlegend=True,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            font=dict(color='#1a3a52')
-        )
+        def balance_chart():
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                name='Available',
+                x=balance_data['Type'],
+                y=balance_data['Available'],
+                marker_color='#2c5f7f',
+                text=balance_data['Available'],
+                textposition='outside'
+            ))
+            fig.add_trace(go.Bar(
+                name='Used',
+                x=balance_data['Type'],
+                y=balance_data['Used'],
+                marker_color='#6ba3c5',
+                text=balance_data['Used'],
+                textposition='outside'
+            ))
         
-        st.plotly_chart(fig, use_container_width=True)
+            fig.update_layout(
+                barmode='group',
+                height=350,
+                margin=dict(l=0, r=0, t=30, b=0),
+                showlegend=True,
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                font=dict(color='#1a3a52')
+            )
+            return fig
+
+        st.plotly_chart(figures.get('balance', balance_data, balance_chart), use_container_width=True)
     
     with col2:
         st.subheader("🎯 Policy Limits")
-        policy = st.session_state.leave_policies[emp.policy]
+        policy = reference().policies[emp.policy]
         
         st.markdown(f"""
         <div style="background: white; padding: 20px; border-radius: 12px; box-shadow: 0 4px 12px rgba(26, 58, 82, 0.08);">
@@ -606,14 +541,10 @@ def show_dashboard():
     
     with col1:
         st.subheader("📅 Your Upcoming Leaves")
-        upcoming = [lr for lr in st.session_state.leave_requests 
-                   if lr.employee_id == current_user and 
-                   lr.start_date >= datetime.now() and 
-                   lr.status == 'Approved']
-        upcoming.sort(key=lambda x: x.start_date)
+        upcoming = overview['upcoming']
         
         if upcoming:
-            for leave in upcoming[:5]:
+            for leave in upcoming:
                 st.markdown(f"""
                 <div class="leave-card">
                     <h4 style="color: #1a3a52; margin: 0 0 10px 0;">{leave.leave_type}</h4>
@@ -626,17 +557,10 @@ def show_dashboard():
     
     with col2:
         st.subheader("👥 Team Absences")
-        team_members = [e for e in st.session_state.employees 
-                       if e.department == emp.department and e.id != current_user]
-        
-        team_leaves = [lr for lr in st.session_state.leave_requests 
-                      if lr.employee_id in [tm.id for tm in team_members] and 
-                      lr.start_date >= datetime.now() and 
-                      lr.status == 'Approved']
-        team_leaves.sort(key=lambda x: x.start_date)
+        team_leaves = overview['team_absences']
         
         if team_leaves:
-            for leave in team_leaves[:5]:
+            for leave in team_leaves:
                 emp_name = get_employee_name(leave.employee_id)
                 st.markdown(f"""
                 <div class="leave-card">
@@ -648,11 +572,16 @@ def show_dashboard():
         else:
             st.info("No upcoming team absences")
     
+    st.markdown("---")
+    st.subheader(f"🔮 {emp.department} Availability Outlook")
+    st.plotly_chart(forecast_chart([emp.department], "Booked vs projected availability, next 13 weeks"),
+                    use_container_width=True)
+    
     # Holidays
     st.markdown("---")
     st.subheader("🎉 Upcoming Holidays")
     
-    upcoming_holidays = [h for h in st.session_state.holidays if h['date'] >= datetime.now()]
+    upcoming_holidays = [h for h in reference().holidays if h['date'] >= datetime.now()]
     upcoming_holidays.sort(key=lambda x: x['date'])
     
     num_cols = max(min(len(upcoming_holidays), 4), 1)
@@ -667,12 +596,13 @@ def show_dashboard():
             </div>
             """, unsafe_allow_html=True)
 
+@timed_page
 def show_new_request():
     st.header("📝 New Leave Request")
     
     current_user = st.session_state.current_user
     emp = get_employee(current_user)
-    balance = st.session_state.leave_balances.get(current_user, {})
+    balance = service.balance(current_user)
     
     with st.form("new_leave_request"):
         col1, col2 = st.columns(2)
@@ -707,7 +637,7 @@ def show_new_request():
             if end_date < start_date:
                 st.error("End date must be after start date")
             else:
-                days_requested = calculate_working_days(
+                days_requested = service.working_days(
                     datetime.combine(start_date, datetime.min.time()),
                     datetime.combine(end_date, datetime.min.time())
                 )
@@ -722,7 +652,7 @@ def show_new_request():
         
         # Validation preview
         if start_date and end_date and end_date >= start_date:
-            errors, warnings = validate_leave_request(
+            errors, warnings = service.validate_request(
                 current_user, leave_type,
                 datetime.combine(start_date, datetime.min.time()),
                 datetime.combine(end_date, datetime.min.time())
@@ -737,7 +667,7 @@ def show_new_request():
                     st.warning(f"⚠️ {warning}")
             
             # Coverage check
-            coverage, overlapping = check_team_coverage(
+            coverage, overlapping = service.team_coverage(
                 current_user,
                 datetime.combine(start_date, datetime.min.time()),
                 datetime.combine(end_date, datetime.min.time())
@@ -764,35 +694,23 @@ def show_new_request():
             elif end_date < start_date:
                 st.error("End date must be after start date")
             else:
-                errors, warnings = validate_leave_request(
+                new_request, errors, warnings = service.request_leave(
                     current_user, leave_type,
                     datetime.combine(start_date, datetime.min.time()),
-                    datetime.combine(end_date, datetime.min.time())
+                    datetime.combine(end_date, datetime.min.time()),
+                    reason
                 )
                 
                 if errors:
                     st.error("Cannot submit request due to policy violations")
                 else:
-                    new_id = f"L{len(st.session_state.leave_requests) + 1:03d}"
-                    new_request = LeaveRequest(
-                        id=new_id,
-                        employee_id=current_user,
-                        leave_type=leave_type,
-                        start_date=datetime.combine(start_date, datetime.min.time()),
-                        end_date=datetime.combine(end_date, datetime.min.time()),
-                        days=days_requested,
-                        reason=reason,
-                        status='Pending',
-                        submitted_date=datetime.now()
-                    )
-                    
-                    st.session_state.leave_requests.append(new_request)
-                    st.success(f"✅ Leave request {new_id} submitted successfully!")
+                    st.success(f"✅ Leave request {new_request.id} submitted successfully!")
                     st.balloons()
                     
                     manager = get_employee(emp.manager_id)
                     st.info(f"Your request will be reviewed by {manager.name}")
 
+@page_fragment
 def show_my_requests():
     st.header("📋 My Leave Requests")
     
@@ -813,40 +731,47 @@ def show_my_requests():
             default=["Annual Leave", "Sick Leave", "Personal Leave"]
         )
     with col3:
+        years = render_cache('request_years', data_key(current_user),
+                             lambda: store.request_years(current_user)) or [datetime.now().year]
         year_filter = st.selectbox(
             "Year",
-            [2024, 2023],
+            years,
             index=0
         )
     
-    my_requests = [lr for lr in st.session_state.leave_requests 
-                   if lr.employee_id == current_user and 
-                   lr.status in status_filter and 
-                   lr.leave_type in leave_type_filter and
-                   lr.start_date.year == year_filter]
+    filters = (current_user, tuple(status_filter), tuple(leave_type_filter), year_filter)
+    summary = render_cache('request_summary', data_key(*filters),
+                           lambda: pages.request_summary(store, *filters))
     
-    my_requests.sort(key=lambda x: x.submitted_date, reverse=True)
-    
-    if not my_requests:
+    if not summary['total']:
         st.info("No leave requests found matching the filters")
         return
     
     # Summary metrics
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Requests", len(my_requests))
+        st.metric("Total Requests", summary['total'])
     with col2:
-        pending = sum(1 for lr in my_requests if lr.status == 'Pending')
-        st.metric("Pending", pending)
+        st.metric("Pending", summary['pending'])
     with col3:
-        approved = sum(1 for lr in my_requests if lr.status == 'Approved')
-        st.metric("Approved", approved)
+        st.metric("Approved", summary['approved'])
     with col4:
-        total_days = sum(lr.days for lr in my_requests if lr.status == 'Approved')
-        st.metric("Total Days", f"{total_days:.0f}")
+        st.metric("Total Days", f"{summary['approved_days']:.0f}")
     
     st.markdown("---")
     
+    # Only the visible page is fetched and rendered
+    num_pages = -(-summary['total'] // REQUESTS_PAGE_SIZE)
+    page_col, info_col = st.columns([1, 3])
+    with page_col:
+        page = st.selectbox("Page", range(1, num_pages + 1), key="my_requests_page")
+    first = (page - 1) * REQUESTS_PAGE_SIZE
+    with info_col:
+        st.caption(f"Showing {first + 1}-{min(first + REQUESTS_PAGE_SIZE, summary['total'])} "
+                   f"of {summary['total']} requests")
+    my_requests = render_cache('request_page', data_key(*filters, page),
+                               lambda: pages.request_page(store, *filters, page, REQUESTS_PAGE_SIZE))
+    
     # Display requests
     for request in my_requests:
         with st.expander(
@@ -890,26 +815,31 @@ def show_my_requests():
                 
                 if request.status == 'Pending':
                     if st.button("🗑️ Cancel Request", key=f"cancel_{request.id}"):
-                        st.session_state.leave_requests.remove(request)
-                        st.success("Request cancelled")
-                        st.rerun()
+                        try:
+                            service.cancel_request(request)
+                        except ConcurrentUpdateError:
+                            st.warning("This request was reviewed before it could be cancelled")
+                        else:
+                            st.success("Request cancelled")
+                            # The sidebar's pending count changes too, so rerun the whole app
+                            st.rerun()
 
+@page_fragment
 def show_approvals():
     st.header("✅ Leave Approvals")
     
     current_user = st.session_state.current_user
     
-    subordinates = [e for e in st.session_state.employees if e.manager_id == current_user]
-    
-    if not subordinates:
+    if not reference().employees.reports_to(current_user):
         st.info("You don't have any team members to approve leaves for")
         return
     
-    pending_requests = [lr for lr in st.session_state.leave_requests 
-                       if lr.status == 'Pending' and 
-                       lr.employee_id in [s.id for s in subordinates]]
+    pending_requests, coverage_results, validation_results, sick_patterns = render_cache(
+        'approval_queue', data_key(current_user, datetime.now().date()), lambda: pages.approval_queue(service, current_user))
     
-    pending_requests.sort(key=lambda x: x.submitted_date)
+    if 'review_message' in st.session_state:
+        kind, message = st.session_state.pop('review_message')
+        getattr(st, kind)(message)
     
     st.subheader(f"📊 Pending Approvals: {len(pending_requests)}")
     
@@ -919,11 +849,7 @@ def show_approvals():
         st.markdown("---")
         st.subheader("Recent Approvals")
         
-        recent = [lr for lr in st.session_state.leave_requests 
-                 if lr.approver_id == current_user and lr.status in ['Approved', 'Rejected']]
-        recent.sort(key=lambda x: x.approved_date if x.approved_date else x.submitted_date, reverse=True)
-        
-        for request in recent[:5]:
+        for request in service.recent_reviews(current_user, limit=5):
             emp_name = get_employee_name(request.employee_id)
             status_icon = "✅" if request.status == "Approved" else "❌"
             st.markdown(f"""
@@ -934,10 +860,49 @@ def show_approvals():
         
         return
     
+    # Bulk actions: validated together, written in one transaction, one rerun
+    with st.expander("📦 Bulk Actions", expanded=len(pending_requests) > 1):
+        by_id = {lr.id: lr for lr in pending_requests}
+        select_all = st.checkbox("Select all pending requests", key="bulk_select_all")
+        selected_ids = st.multiselect(
+            "Requests",
+            list(by_id),
+            default=list(by_id) if select_all else [],
+            format_func=lambda rid: (f"{get_employee_name(by_id[rid].employee_id)} - {by_id[rid].leave_type} "
+                                     f"({by_id[rid].days} days, {by_id[rid].start_date.strftime('%b %d')})"),
+            key=f"bulk_selection_{select_all}"
+        )
+        bulk_comments = st.text_input("Comments (optional)", key="bulk_comments",
+                                      placeholder="Applied to every selected request...")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            bulk_approve = st.button(f"✅ Approve Selected ({len(selected_ids)})", key="bulk_approve",
+                                     type="primary", disabled=not selected_ids, use_container_width=True)
+        with col2:
+            bulk_reject = st.button(f"❌ Reject Selected ({len(selected_ids)})", key="bulk_reject",
+                                    disabled=not selected_ids, use_container_width=True)
+        
+        selected = [by_id[rid] for rid in selected_ids]
+        if bulk_approve:
+            validation_by_id = {lr.id: result for lr, result in zip(pending_requests, validation_results)}
+            problems = service.check_bulk_approval(selected, [validation_by_id[lr.id] for lr in selected])
+            if problems:
+                st.error("Nothing was approved. Resolve these first or deselect the requests:")
+                for lr, problem in problems:
+                    st.error(f"❌ {get_employee_name(lr.employee_id)} ({lr.id}): {problem}")
+            else:
+                submit_review(selected, 'Approved', current_user, bulk_comments,
+                              f"✅ Approved {len(selected)} request(s)")
+        if bulk_reject:
+            submit_review(selected, 'Rejected', current_user, bulk_comments or "Request rejected",
+                          f"❌ Rejected {len(selected)} request(s)")
+    
     # Display pending requests
-    for request in pending_requests:
+    for request, (coverage, overlapping_count), (errors, warnings) in zip(
+            pending_requests, coverage_results, validation_results):
         emp = get_employee(request.employee_id)
-        balance = st.session_state.leave_balances.get(request.employee_id, {})
+        balance = service.balance(request.employee_id)
         
         with st.expander(
             f"🔔 {emp.name} - {request.leave_type} ({request.days} days) - "
@@ -963,12 +928,6 @@ def show_approvals():
                 """, unsafe_allow_html=True)
             
             with col2:
-                coverage, overlapping = check_team_coverage(
-                    request.employee_id,
-                    request.start_date,
-                    request.end_date
-                )
-                
                 coverage_color = '#4caf50' if coverage >= 0.7 else '#ff9800' if coverage >= 0.5 else '#f44336'
                 st.markdown(f"""
                 <div style="background: white; padding: 15px; border-radius: 8px; text-align: center;">
@@ -977,21 +936,14 @@ def show_approvals():
                 </div>
                 """, unsafe_allow_html=True)
                 
-                if overlapping:
-                    st.warning(f"⚠️ {len(overlapping)} team member(s) also on leave")
+                if overlapping_count:
+                    st.warning(f"⚠️ {overlapping_count} team member(s) also on leave")
                 
                 if request.leave_type == 'Sick Leave':
-                    pattern = analyze_sick_leave_patterns(request.employee_id)
+                    pattern = sick_patterns[request.employee_id]
                     if pattern['alert_level'] != 'green':
                         st.warning(f"⚠️ {pattern['pattern']}")
             
-            errors, warnings = validate_leave_request(
-                request.employee_id,
-                request.leave_type,
-                request.start_date,
-                request.end_date
-            )
-            
             if errors:
                 for error in errors:
                     st.error(f"❌ {error}")
@@ -1012,66 +964,64 @@ def show_approvals():
             
             with col2:
                 if st.button("✅ Approve", key=f"approve_{request.id}", type="primary", use_container_width=True):
-                    request.status = 'Approved'
-                    request.approver_id = current_user
-                    request.approved_date = datetime.now()
-                    request.comments = comments
-                    
-                    update_leave_balance(request.employee_id, request.leave_type, request.days, 'deduct')
-                    
-                    st.success(f"✅ Approved leave for {emp.name}")
-                    st.rerun()
+                    submit_review([request], 'Approved', current_user, comments,
+                                  f"✅ Approved leave for {emp.name}")
             
             with col3:
                 if st.button("❌ Reject", key=f"reject_{request.id}", use_container_width=True):
-                    request.status = 'Rejected'
-                    request.approver_id = current_user
-                    request.approved_date = datetime.now()
-                    request.comments = comments if comments else "Request rejected"
-                    
-                    st.error(f"❌ Rejected leave for {emp.name}")
-                    st.rerun()
+                    submit_review([request], 'Rejected', current_user,
+                                  comments if comments else "Request rejected",
+                                  f"❌ Rejected leave for {emp.name}")
 
+@page_fragment
 def show_team_calendar():
+    import plotly.graph_objects as go
+
     st.header("📅 Team Availability Calendar")
     
     current_user = st.session_state.current_user
     emp = get_employee(current_user)
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        view_type = st.selectbox("View", ["My Team", "Department", "All Employees"])
+        view_type = st.selectbox("View", pages.CALENDAR_VIEWS)
     with col2:
+        range_type = st.selectbox("Range", ["Month", "12 Months"])
+    with col3:
         selected_month = st.selectbox(
-            "Month",
+            "Month" if range_type == "Month" else "Starting Month",
             range(1, 13),
             format_func=lambda x: calendar.month_name[x],
             index=datetime.now().month - 1
         )
-    with col3:
-        selected_year = st.selectbox("Year", [2024, 2025], index=0)
+    with col4:
+        years = calendar_years()
+        selected_year = st.selectbox("Year", years, index=years.index(datetime.now().year))
     
-    if view_type == "My Team":
-        employees = [e for e in st.session_state.employees if e.manager_id == current_user]
-    elif view_type == "Department":
-        employees = [e for e in st.session_state.employees if e.department == emp.department]
-    else:
-        employees = st.session_state.employees
+    employees = pages.calendar_employees(reference().employees, view_type, emp)
     
     if not employees:
         st.info("No employees to display for this view")
         return
     
-    start_date = datetime(selected_year, selected_month, 1)
-    if selected_month == 12:
-        end_date = datetime(selected_year + 1, 1, 1) - timedelta(days=1)
+    # Only the visible months are loaded; "Load more" extends the window a few months at a time
+    if range_type == "Month":
+        num_months = 1
     else:
-        end_date = datetime(selected_year, selected_month + 1, 1) - timedelta(days=1)
+        window_key = (selected_year, selected_month)
+        if st.session_state.get('calendar_window_start') != window_key:
+            st.session_state.calendar_window_start = window_key
+            st.session_state.calendar_months = 12
+        num_months = st.session_state.calendar_months
+    
+    start_date = datetime(selected_year, selected_month, 1)
+    end_year, end_month = shift_month(selected_year, selected_month, num_months)
+    end_date = datetime(end_year, end_month, 1) - timedelta(days=1)
     
-    leaves_in_period = [lr for lr in st.session_state.leave_requests 
-                       if lr.status == 'Approved' and 
-                       lr.employee_id in [e.id for e in employees] and
-                       not (lr.end_date < start_date or lr.start_date > end_date)]
+    if 'calendar_cache' not in st.session_state:
+        st.session_state.calendar_cache = MonthlyAvailabilityCache()
+    leaves_in_period, df_daily = pages.calendar_window(service, st.session_state.calendar_cache, view_type, emp,
+                                                       employees, selected_year, selected_month, num_months)
     
     st.markdown("---")
     col1, col2, col3 = st.columns(3)
@@ -1081,65 +1031,73 @@ def show_team_calendar():
         total_leave_days = sum(lr.days for lr in leaves_in_period)
         st.metric("Total Leave Days", f"{total_leave_days:.0f}")
     with col3:
-        avg_availability = 100 - (total_leave_days / (len(employees) * 20) * 100) if employees else 100
+        avg_availability = 100 - (total_leave_days / (len(employees) * 20 * num_months) * 100) if employees else 100
         st.metric("Avg Availability", f"{avg_availability:.0f}%")
     
     st.markdown("---")
     st.subheader("📊 Daily Team Availability")
     
-    daily_data = []
-    current = start_date
-    while current <= end_date:
-        on_leave = sum(1 for lr in leaves_in_period 
-                      if lr.start_date.date() <= current.date() <= lr.end_date.date())
-        available = len(employees) - on_leave
-        availability_pct = (available / len(employees) * 100) if employees else 100
-        
-        daily_data.append({
-            'Date': current,
-            'Available': available,
-            'On Leave': on_leave,
-            'Availability %': availability_pct
-        })
-        current += timedelta(days=1)
-    
-    df_daily = pd.DataFrame(daily_data)
+    def availability_chart():
+        fig = go.Figure()
     
-    fig = go.Figure()
+        fig.add_trace(go.Bar(
+            x=df_daily['Date'],
+            y=df_daily['Available'],
+            name='Available',
+            marker_color='#2c5f7f'
+        ))
     
-    fig.add_trace(go.Bar(
-        x=df_daily['Date'],
-        y=df_daily['Available'],
-        name='Available',
-        marker_color='#2c5f7f'
-    ))
+        fig.add_trace(go.Bar(
+            x=df_daily['Date'],
+            y=df_daily['On Leave'],
+            name='On Leave',
+            marker_color='#6ba3c5'
+        ))
     
-    fig.add_trace(go.Bar(
-        x=df_daily['Date'],
-        y=df_daily['On Leave'],
-        name='On Leave',
-        marker_color='#6ba3c5'
-    ))
+        fig.update_layout(
+            barmode='stack',
+            height=350,
+            xaxis_title="Date",
+            yaxis_title="Number of Employees",
+            hovermode='x unified',
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='#1a3a52'),
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+        )
+        return fig
+
+    st.plotly_chart(figures.get('daily_availability', df_daily, availability_chart), use_container_width=True)
     
-    fig.update_layout(
-        barmode='stack',
-        height=350,
-        xaxis_title="Date",
-        yaxis_title="Number of Employees",
-        hovermode='x unified',
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1a3a52'),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
+    if range_type != "Month":
+        st.caption(f"Showing {calendar.month_abbr[selected_month]} {selected_year} - {end_date.strftime('%b %Y')}")
+        if st.button("➕ Load 6 more months", key="calendar_load_more"):
+            st.session_state.calendar_months += 6
+            rerun_page()
     
-    st.plotly_chart(fig, use_container_width=True)
+    st.markdown("---")
+    st.subheader("🔮 Projected Availability (Next 13 Weeks)")
+    forecast_departments = None if view_type == "All Employees" else [emp.department]
+    st.plotly_chart(forecast_chart(forecast_departments, "All Departments" if forecast_departments is None
+                                   else emp.department), use_container_width=True)
+    st.caption("Projected absence is the larger of booked leave (pending requests weighted by the "
+               "approval rate) and the same weeks' average in past years")
     
     st.markdown("---")
     st.subheader("📋 Leave Details")
     
     if leaves_in_period:
-        for leave in sorted(leaves_in_period, key=lambda x: x.start_date):
+        # Long windows (12 months, "load more") can hold thousands of leaves: render one page
+        leaves_in_period = sorted(leaves_in_period, key=lambda x: x.start_date)
+        num_pages = -(-len(leaves_in_period) // CALENDAR_PAGE_SIZE)
+        page_col, info_col = st.columns([1, 3])
+        with page_col:
+            page = st.selectbox("Page", range(1, num_pages + 1), key="calendar_details_page")
+        first = (page - 1) * CALENDAR_PAGE_SIZE
+        with info_col:
+            st.caption(f"Showing {first + 1}-{min(first + CALENDAR_PAGE_SIZE, len(leaves_in_period))} "
+                       f"of {len(leaves_in_period)} leaves")
+        for leave in leaves_in_period[first:first + CALENDAR_PAGE_SIZE]:
             emp_name = get_employee_name(leave.employee_id)
             emp_dept = get_employee(leave.employee_id).department
             
@@ -1163,8 +1121,8 @@ def show_team_calendar():
     st.markdown("---")
     st.subheader("🎉 Holidays")
     
-    holidays_in_month = [h for h in st.session_state.holidays 
-                        if h['date'].month == selected_month and h['date'].year == selected_year]
+    holidays_in_month = sorted((h for h in reference().holidays 
+                                if start_date <= h['date'] <= end_date), key=lambda h: h['date'])
     
     if holidays_in_month:
         for holiday in holidays_in_month:
@@ -1174,15 +1132,22 @@ def show_team_calendar():
             </div>
             """, unsafe_allow_html=True)
     else:
-        st.info("No holidays in this month")
+        st.info("No holidays in this period")
 
+@page_fragment
 def show_analytics():
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from lms.trends import leave_categories
+
     st.header("📊 Leave Analytics & Insights")
     
     current_user = st.session_state.current_user
     emp = get_employee(current_user)
     
-    is_manager = any(e.manager_id == current_user for e in st.session_state.employees)
+    is_manager = reference().employees.is_manager(current_user)
     
     tab1, tab2, tab3, tab4 = st.tabs([
         "📈 Usage Trends", 
@@ -1194,72 +1159,96 @@ def show_analytics():
     with tab1:
         st.subheader("Leave Usage Trends")
         
-        my_leaves = [lr for lr in st.session_state.leave_requests 
-                    if lr.employee_id == current_user and lr.status == 'Approved']
+        trend_scopes = {"Me": [current_user]}
+        if is_manager:
+            trend_scopes["My Team"] = [e.id for e in reference().employees.reports_to(current_user)]
+        if emp.id.startswith('M'):
+            trend_scopes["My Department"] = [e.id for e in reference().employees.in_department(emp.department)]
+            trend_scopes["Company"] = None
+        trend_scope = st.selectbox("Scope", list(trend_scopes), key="trend_scope") if len(trend_scopes) > 1 else "Me"
         
-        if my_leaves:
-            monthly_usage = {}
-            for leave in my_leaves:
-                month_key = leave.start_date.strftime('%Y-%m')
-                if month_key not in monthly_usage:
-                    monthly_usage[month_key] = {'Annual': 0, 'Sick': 0, 'Personal': 0}
-                
-                leave_category = leave.leave_type.split()[0]
-                monthly_usage[month_key][leave_category] += leave.days
-            
-            df_monthly = pd.DataFrame([
-                {'Month': k, 'Annual': v['Annual'], 'Sick': v['Sick'], 'Personal': v['Personal']}
-                for k, v in sorted(monthly_usage.items())
-            ])
+        my_leaves, df_monthly, by_department = pages.usage_trends(service, trend_scopes[trend_scope],
+                                                                  by_department=trend_scope == "Company")
+        
+        if len(my_leaves):
+            df_monthly = df_monthly.set_axis(df_monthly.index.strftime('%Y-%m').rename('Month')).reset_index()
             
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df_monthly['Month'], y=df_monthly['Annual'], 
-                                    mode='lines+markers', name='Annual', line=dict(color='#2c5f7f', width=3)))
-            fig.add_trace(go.Scatter(x=df_monthly['Month'], y=df_monthly['Sick'], 
-                                    mode='lines+markers', name='Sick', line=dict(color='#4a7fa0', width=3)))
-            fig.add_trace(go.Scatter(x=df_monthly['Month'], y=df_monthly['Personal'], 
-                                    mode='lines+markers', name='Personal', line=dict(color='#6ba3c5', width=3)))
+            def usage_chart():
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(x=df_monthly['Month'], y=df_monthly['Annual'], 
+                                        mode='lines+markers', name='Annual', line=dict(color='#2c5f7f', width=3)))
+                fig.add_trace(go.Scatter(x=df_monthly['Month'], y=df_monthly['Sick'], 
+                                        mode='lines+markers', name='Sick', line=dict(color='#4a7fa0', width=3)))
+                fig.add_trace(go.Scatter(x=df_monthly['Month'], y=df_monthly['Personal'], 
+                                        mode='lines+markers', name='Personal', line=dict(color='#6ba3c5', width=3)))
             
-            fig.update_layout(
-                title="Your Monthly Leave Usage",
-                xaxis_title="Month",
-                yaxis_title="Days",
-                height=400,
-                hovermode='x unified',
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#1a3a52')
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+                fig.update_layout(
+                    title="Your Monthly Leave Usage" if trend_scope == "Me" else f"Monthly Leave Usage - {trend_scope}",
+                    xaxis_title="Month",
+                    yaxis_title="Days",
+                    height=400,
+                    hovermode='x unified',
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='#1a3a52')
+                )
+                return fig
+
+            st.plotly_chart(figures.get('monthly_usage', (df_monthly, trend_scope), usage_chart),
+                            use_container_width=True)
             
             col1, col2 = st.columns(2)
             
             with col1:
                 total_by_type = df_monthly[['Annual', 'Sick', 'Personal']].sum()
-                fig_pie = px.pie(
-                    values=total_by_type.values,
-                    names=total_by_type.index,
-                    title="Leave Distribution by Type",
-                    color_discrete_sequence=['#2c5f7f', '#4a7fa0', '#6ba3c5']
-                )
-                fig_pie.update_layout(font=dict(color='#1a3a52'))
-                st.plotly_chart(fig_pie, use_container_width=True)
+                def type_chart():
+                    fig_pie = px.pie(
+                        values=total_by_type.values,
+                        names=total_by_type.index,
+                        title="Leave Distribution by Type",
+                        color_discrete_sequence=['#2c5f7f', '#4a7fa0', '#6ba3c5']
+                    )
+                    fig_pie.update_layout(font=dict(color='#1a3a52'))
+                    return fig_pie
+
+                st.plotly_chart(figures.get('usage_by_type', total_by_type, type_chart), use_container_width=True)
             
             with col2:
-                avg_duration = np.mean([lr.days for lr in my_leaves])
+                avg_duration = my_leaves['days'].mean()
                 total_leaves = len(my_leaves)
                 
                 st.metric("Average Leave Duration", f"{avg_duration:.1f} days")
                 st.metric("Total Leave Instances", total_leaves)
-                st.metric("Total Days Taken", f"{sum(lr.days for lr in my_leaves):.0f}")
+                st.metric("Total Days Taken", f"{my_leaves['days'].sum():.0f}")
+            
+            if by_department is not None:
+                by_department = by_department.sum(axis=1).rename('Days').reset_index()
+                def department_chart():
+                    fig_dept = px.line(
+                        by_department,
+                        x='Month',
+                        y='Days',
+                        color='group',
+                        title="Monthly Leave Usage by Department",
+                        labels={'group': 'Department'},
+                        markers=True
+                    )
+                    fig_dept.update_layout(
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='#1a3a52')
+                    )
+                    return fig_dept
+
+                st.plotly_chart(figures.get('usage_by_department', by_department, department_chart),
+                                use_container_width=True)
         else:
             st.info("No leave history available yet")
     
     with tab2:
         st.subheader("🏥 Wellness & Pattern Insights")
         
-        pattern = analyze_sick_leave_patterns(current_user)
+        pattern = service.sick_leave_pattern(current_user)
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -1286,54 +1275,19 @@ def show_analytics():
         else:
             st.success("No concerning sick leave patterns detected. Keep up the good health! 💪")
         
-        sick_leaves = [lr for lr in st.session_state.leave_requests 
-                      if lr.employee_id == current_user and 
-                      lr.leave_type == 'Sick Leave' and 
-                      lr.status == 'Approved']
+        sick_leaves = service.leave_frame([current_user], leave_type='Sick Leave')
         
-        if sick_leaves:
-            day_counts = {i: 0 for i in range(7)}
-            for leave in sick_leaves:
-                day_counts[leave.start_date.weekday()] += 1
+        if len(sick_leaves):
+            day_counts = np.bincount(sick_leaves['start_date'].dt.weekday, minlength=7)
             
             days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            fig = px.bar(
-                x=days,
-                y=[day_counts[i] for i in range(7)],
-                title="Sick Leave by Day of Week",
-                labels={'x': 'Day', 'y': 'Count'},
-                color=[day_counts[i] for i in range(7)],
-                color_continuous_scale=[[0, '#6ba3c5'], [1, '#1a3a52']]
-            )
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='#1a3a52')
-            )
-            st.plotly_chart(fig, use_container_width=True)
-    
-    with tab3:
-        if is_manager:
-            st.subheader("👥 Team Analytics")
-            
-            subordinates = [e for e in st.session_state.employees if e.manager_id == current_user]
-            
-            team_leaves = [lr for lr in st.session_state.leave_requests 
-                          if lr.employee_id in [s.id for s in subordinates] and 
-                          lr.status == 'Approved']
-            
-            if team_leaves:
-                team_usage = {}
-                for sub in subordinates:
-                    sub_leaves = [lr for lr in team_leaves if lr.employee_id == sub.id]
-                    team_usage[sub.name] = sum(lr.days for lr in sub_leaves)
-                
+            def weekday_chart():
                 fig = px.bar(
-                    x=list(team_usage.keys()),
-                    y=list(team_usage.values()),
-                    title="Team Leave Usage Comparison",
-                    labels={'x': 'Employee', 'y': 'Days'},
-                    color=list(team_usage.values()),
+                    x=days,
+                    y=day_counts,
+                    title="Sick Leave by Day of Week",
+                    labels={'x': 'Day', 'y': 'Count'},
+                    color=day_counts,
                     color_continuous_scale=[[0, '#6ba3c5'], [1, '#1a3a52']]
                 )
                 fig.update_layout(
@@ -1341,12 +1295,62 @@ def show_analytics():
                     paper_bgcolor='rgba(0,0,0,0)',
                     font=dict(color='#1a3a52')
                 )
-                st.plotly_chart(fig, use_container_width=True)
+                return fig
+
+            st.plotly_chart(figures.get('sick_by_weekday', day_counts, weekday_chart), use_container_width=True)
+        
+        if emp.id.startswith('M'):
+            st.markdown("---")
+            st.subheader("🏢 Organisation Wellness Alerts")
+            
+            alerts = service.wellness_alerts()
+            if alerts:
+                st.dataframe(pd.DataFrame([
+                    {
+                        'Employee': get_employee_name(emp_id),
+                        'Department': get_employee(emp_id).department if get_employee(emp_id) else "Unknown",
+                        'Alert': pattern['alert_level'].upper(),
+                        'Pattern': pattern['pattern'],
+                        'Sick Days': pattern['total_days'],
+                        'Instances': pattern['frequency']
+                    }
+                    for emp_id, pattern in alerts
+                ]), use_container_width=True, hide_index=True)
+            else:
+                st.success("No wellness alerts across the organisation")
+    
+    with tab3:
+        if is_manager:
+            st.subheader("👥 Team Analytics")
+            
+            subordinates = reference().employees.reports_to(current_user)
+            subordinate_ids = {s.id for s in subordinates}
+            
+            team_leaves = service.leave_frame(subordinate_ids)
+            
+            if len(team_leaves):
+                days_by_employee = team_leaves.groupby('employee_id', observed=True)['days'].sum()
+                team_usage = {sub.name: days_by_employee.get(sub.id, 0) for sub in subordinates}
                 
-                leave_type_summary = {'Annual': 0, 'Sick': 0, 'Personal': 0}
-                for leave in team_leaves:
-                    leave_category = leave.leave_type.split()[0]
-                    leave_type_summary[leave_category] += leave.days
+                def team_chart():
+                    fig = px.bar(
+                        x=list(team_usage.keys()),
+                        y=list(team_usage.values()),
+                        title="Team Leave Usage Comparison",
+                        labels={'x': 'Employee', 'y': 'Days'},
+                        color=list(team_usage.values()),
+                        color_continuous_scale=[[0, '#6ba3c5'], [1, '#1a3a52']]
+                    )
+                    fig.update_layout(
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='#1a3a52')
+                    )
+                    return fig
+
+                st.plotly_chart(figures.get('team_usage', team_usage, team_chart), use_container_width=True)
+                
+                leave_type_summary = team_leaves.groupby(leave_categories(team_leaves), observed=False)['days'].sum()
                 
                 col1, col2, col3 = st.columns(3)
                 with col1:
@@ -1363,8 +1367,9 @@ def show_analytics():
                 if high_users:
                     st.info(f"**High Leave Utilization:** {', '.join(high_users)}")
                 
+                team_patterns = service.sick_leave_patterns([sub.id for sub in subordinates])
                 for sub in subordinates:
-                    pattern = analyze_sick_leave_patterns(sub.id)
+                    pattern = team_patterns[sub.id]
                     if pattern['alert_level'] == 'red':
                         st.warning(f"**Wellness Check Recommended for {sub.name}:** {pattern['pattern']}")
             else:
@@ -1379,79 +1384,92 @@ def show_analytics():
         
         with col1:
             st.write("**Personal Leave Report**")
-            my_leaves = [lr for lr in st.session_state.leave_requests 
-                        if lr.employee_id == current_user]
+            my_leaves = service.leave_frame([current_user], status=None).sort_values('start_date')
             
-            if my_leaves:
-                df_report = pd.DataFrame([
-                    {
-                        'Request ID': lr.id,
-                        'Leave Type': lr.leave_type,
-                        'Start Date': lr.start_date.strftime('%Y-%m-%d'),
-                        'End Date': lr.end_date.strftime('%Y-%m-%d'),
-                        'Days': lr.days,
-                        'Status': lr.status,
-                        'Submitted': lr.submitted_date.strftime('%Y-%m-%d')
-                    }
-                    for lr in my_leaves
-                ])
+            if len(my_leaves):
+                df_report = pd.DataFrame({
+                    'Request ID': my_leaves['id'],
+                    'Leave Type': my_leaves['leave_type'],
+                    'Start Date': my_leaves['start_date'].dt.strftime('%Y-%m-%d'),
+                    'End Date': my_leaves['end_date'].dt.strftime('%Y-%m-%d'),
+                    'Days': my_leaves['days'],
+                    'Status': my_leaves['status'],
+                    'Submitted': my_leaves['submitted_date'].dt.strftime('%Y-%m-%d')
+                })
                 
                 st.dataframe(df_report, use_container_width=True)
                 
-                csv = df_report.to_csv(index=False)
-                st.download_button(
-                    "📥 Download CSV",
-                    csv,
-                    "my_leave_report.csv",
-                    "text/csv",
-                    key='download-personal-csv'
-                )
+                report_download("📥 Download CSV", "my_leave_report", 'download-personal-csv',
+                                employee_ids=[current_user])
         
         with col2:
             if is_manager:
                 st.write("**Team Leave Report**")
-                subordinates = [e for e in st.session_state.employees if e.manager_id == current_user]
-                team_leaves = [lr for lr in st.session_state.leave_requests 
-                              if lr.employee_id in [s.id for s in subordinates]]
+                subordinate_ids = {e.id for e in reference().employees.reports_to(current_user)}
+                team_leaves = service.leave_frame(subordinate_ids, status=None).sort_values('start_date')
                 
-                if team_leaves:
-                    df_team_report = pd.DataFrame([
-                        {
-                            'Employee': get_employee_name(lr.employee_id),
-                            'Department': get_employee(lr.employee_id).department,
-                            'Leave Type': lr.leave_type,
-                            'Start Date': lr.start_date.strftime('%Y-%m-%d'),
-                            'End Date': lr.end_date.strftime('%Y-%m-%d'),
-                            'Days': lr.days,
-                            'Status': lr.status
-                        }
-                        for lr in team_leaves
-                    ])
+                if len(team_leaves):
+                    employee_ids = team_leaves['employee_id']
+                    df_team_report = pd.DataFrame({
+                        'Employee': employee_ids.map(get_employee_name),
+                        'Department': employee_ids.map(lambda emp_id: get_employee(emp_id).department),
+                        'Leave Type': team_leaves['leave_type'],
+                        'Start Date': team_leaves['start_date'].dt.strftime('%Y-%m-%d'),
+                        'End Date': team_leaves['end_date'].dt.strftime('%Y-%m-%d'),
+                        'Days': team_leaves['days'],
+                        'Status': team_leaves['status']
+                    })
                     
                     st.dataframe(df_team_report, use_container_width=True)
                     
-                    csv_team = df_team_report.to_csv(index=False)
-                    st.download_button(
-                        "📥 Download Team CSV",
-                        csv_team,
-                        "team_leave_report.csv",
-                        "text/csv",
-                        key='download-team-csv'
-                    )
+                    report_download("📥 Download Team CSV", "team_leave_report", 'download-team-csv',
+                                    employee_ids=subordinate_ids)
+        
+        if emp.id.startswith('M'):
+            st.markdown("---")
+            st.write("**HR Export**")
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                export_scope = st.radio("Scope", ["Company-wide", "Department"], key="export_scope")
+                export_department = None
+                if export_scope == "Department":
+                    export_department = st.selectbox("Department", reference().employees.departments(),
+                                                     key="export_department")
+            with col2:
+                limit_dates = st.checkbox("Limit to date range", key="export_limit_dates")
+                export_start = export_end = None
+                if limit_dates:
+                    today = datetime.now().date()
+                    export_start = st.date_input("From", today.replace(month=1, day=1), key="export_start")
+                    export_end = st.date_input("To", today.replace(month=12, day=31), key="export_end")
+                    export_start = datetime.combine(export_start, datetime.min.time())
+                    export_end = datetime.combine(export_end, datetime.min.time())
+            with col3:
+                export_format = st.radio("Format", list(EXPORT_FORMATS), key="export_format")
+            
+            scope_name = export_department.lower() if export_department else "company"
+            report_download(f"📥 Download {export_format}", f"{scope_name}_leave_report",
+                            'download-hr-export', export_format,
+                            department=export_department, start=export_start, end=export_end)
 
+@page_fragment
 def show_settings():
+    import pandas as pd
+
     st.header("⚙️ Settings & Configuration")
     
     current_user = st.session_state.current_user
     emp = get_employee(current_user)
     is_admin = emp.id.startswith('M')
     
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tabs = st.tabs([
         "👤 Profile",
         "📋 Leave Policies",
         "🎉 Holidays",
         "🔔 Notifications"
-    ])
+    ] + (["🩺 Diagnostics"] if is_admin else []))
+    tab1, tab2, tab3, tab4 = tabs[:4]
     
     with tab1:
         st.subheader("Profile Information")
@@ -1471,11 +1489,20 @@ def show_settings():
         
         st.markdown("---")
         st.info("To update your profile information, please contact HR.")
+
+        with st.expander("📒 Balance History"):
+            entries = store.ledger(emp.id)
+            if entries:
+                history = pd.DataFrame(entries)[['recorded_at', 'bucket', 'kind', 'days', 'request_id']]
+                history.columns = ['Recorded', 'Balance', 'Entry', 'Days', 'Request']
+                st.dataframe(history, use_container_width=True, hide_index=True)
+            else:
+                st.info("No balance changes recorded yet.")
     
     with tab2:
         st.subheader("Leave Policies")
         
-        policy = st.session_state.leave_policies[emp.policy]
+        policy = reference().policies[emp.policy]
         
         st.markdown(f"<h3 style='color: #1a3a52;'>Your Current Policy: {emp.policy}</h3>", unsafe_allow_html=True)
         
@@ -1496,7 +1523,7 @@ def show_settings():
             st.subheader("Manage Policies (Admin)")
             
             with st.expander("View All Policies"):
-                for policy_name, policy_obj in st.session_state.leave_policies.items():
+                for policy_name, policy_obj in reference().policies.items():
                     st.markdown(f"""
                     <div class="leave-card">
                         <h4 style="color: #1a3a52; margin-top: 0;">{policy_name} Policy</h4>
@@ -1516,11 +1543,54 @@ def show_settings():
                         </div>
                     </div>
                     """, unsafe_allow_html=True)
-    
+
+            with st.expander("✏️ Edit Policy"):
+                edit_name = st.selectbox("Policy", list(reference().policies), key="edit_policy_name")
+                current = reference().policies[edit_name]
+
+                with st.form("edit_policy"):
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        annual_days = st.number_input("Annual Days", min_value=0, value=current.annual_days)
+                        sick_days = st.number_input("Sick Days", min_value=0, value=current.sick_days)
+                    with col2:
+                        personal_days = st.number_input("Personal Days", min_value=0, value=current.personal_days)
+                        carryover_limit = st.number_input("Carryover Limit", min_value=0, value=current.carryover_limit)
+                    with col3:
+                        max_consecutive_days = st.number_input("Max Consecutive", min_value=1, value=current.max_consecutive_days)
+                        min_notice_days = st.number_input("Min Notice", min_value=0, value=current.min_notice_days)
+
+                    if st.form_submit_button("💾 Save Policy", type="primary"):
+                        service.save_policy(LeavePolicy(edit_name, int(annual_days), int(sick_days), int(personal_days),
+                                                int(carryover_limit), int(max_consecutive_days), int(min_notice_days)))
+                        st.success(f"Updated {edit_name} policy")
+                        rerun_page()
+
+            with st.expander("🔁 Accrual & Year-End Rollover"):
+                st.caption("Accrual opens the year and tops annual leave up to what has been earned by the "
+                           "end of this month. Rollover carries unused annual leave over up to each policy's "
+                           "limit, expires the rest and opens the next year. Both skip work already done; "
+                           "for large workforces run `python -m lms.accrual` instead.")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button("📈 Run Accrual", key="run_accrual"):
+                        updated = run_accrual(store, reference().policies, reference().employees, datetime.now())
+                        service.refresh()
+                        st.success(f"Accrued leave for {updated} employee(s)")
+                with col2:
+                    # Only years that have ended can be closed
+                    closing_year = st.number_input("Close Year", min_value=2000, max_value=datetime.now().year - 1,
+                                                   value=datetime.now().year - 1, key="rollover_year")
+                    if st.button("🔁 Run Rollover", key="run_rollover"):
+                        rolled = run_year_end(store, reference().policies, reference().employees,
+                                              int(closing_year))
+                        service.refresh()
+                        st.success(f"Rolled over {rolled} employee(s) into {int(closing_year) + 1}")
+
     with tab3:
         st.subheader("Company Holidays")
         
-        upcoming_holidays = sorted(st.session_state.holidays, key=lambda x: x['date'])
+        upcoming_holidays = sorted(reference().holidays, key=lambda x: x['date'])
         
         for holiday in upcoming_holidays:
             col1, col2, col3 = st.columns([3, 2, 1])
@@ -1531,8 +1601,8 @@ def show_settings():
             with col3:
                 if is_admin:
                     if st.button("🗑️ Delete", key=f"del_holiday_{holiday['date']}"):
-                        st.session_state.holidays.remove(holiday)
-                        st.rerun()
+                        service.delete_holiday(holiday)
+                        rerun_page()
         
         if is_admin:
             st.markdown("---")
@@ -1545,12 +1615,12 @@ def show_settings():
                 
                 if st.button("Add Holiday", type="primary"):
                     if new_holiday_name:
-                        st.session_state.holidays.append({
+                        service.add_holiday({
                             'date': datetime.combine(new_holiday_date, datetime.min.time()),
                             'name': new_holiday_name
                         })
                         st.success(f"Added {new_holiday_name}")
-                        st.rerun()
+                        rerun_page()
     
     with tab4:
         st.subheader("Notification Preferences")
@@ -1594,6 +1664,45 @@ def show_settings():
         if st.button("💾 Save Preferences", type="primary", use_container_width=False):
             st.success("✅ Preferences saved successfully!")
             st.balloons()
+    
+    if is_admin:
+        with tabs[4]:
+            show_diagnostics()
+
+def show_diagnostics():
+    import pandas as pd
+
+    st.subheader("Performance Diagnostics")
+    st.toggle("⏱️ Record timings", value=metrics.enabled, key="metrics_enabled",
+              on_change=lambda: setattr(metrics, 'enabled', st.session_state.metrics_enabled),
+              help="Times pages and service calls for every session on this server. "
+                   "Set LMS_METRICS=1 to record from startup.")
+    
+    rows = metrics.snapshot()
+    if not rows:
+        st.info("No timings recorded yet. Turn recording on and use the app for a while.")
+        return
+    
+    timings = pd.DataFrame(rows).rename(columns={
+        'name': 'Operation', 'calls': 'Calls', 'errors': 'Errors', 'total_ms': 'Total (ms)',
+        'mean_ms': 'Mean (ms)', 'p50_ms': 'p50 (ms)', 'p95_ms': 'p95 (ms)', 'max_ms': 'Max (ms)',
+        'records': 'Records Scanned'
+    })
+    st.caption(f"Since {datetime.fromtimestamp(metrics.since).strftime('%b %d, %Y %H:%M')}; "
+               "percentiles cover each operation's latest calls")
+    st.dataframe(timings.round(2), use_container_width=True, hide_index=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("📥 Export JSON", metrics.to_json(), "lms_metrics.json", "application/json",
+                           key="metrics_json")
+    with col2:
+        st.download_button("📥 Export Prometheus", metrics.to_prometheus(), "lms_metrics.prom", "text/plain",
+                           key="metrics_prometheus")
+    with col3:
+        if st.button("🗑️ Reset Timings", key="metrics_reset"):
+            metrics.reset()
+            rerun_page()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""Core domain engines for the Leave Management System."""
+
+from lms.aggregates import LeaveAggregates
+from lms.availability import AvailabilityMatrix, MonthlyAvailabilityCache
+from lms.directory import EmployeeDirectory
+from lms.figures import FigureCache, get_figure_cache
+from lms.history import LeaveHistory
+from lms.intervals import LeaveIndex
+from lms.metrics import Metrics, get_metrics
+from lms.models import Employee, LeavePolicy, LeaveRequest
+from lms.reference import ReferenceCache, ReferenceData, get_reference_cache
+from lms.service import LeaveService, get_service
+from lms.storage import ConcurrentUpdateError, LeaveStore, get_store
+from lms.wellness import WellnessAnalyzer
+from lms.workdays import WorkdayCalendar
+
+__all__ = [
+    'AvailabilityMatrix',
+    'ConcurrentUpdateError',
+    'Employee',
+    'EmployeeDirectory',
+    'FigureCache',
+    'LeaveAggregates',
+    'LeaveHistory',
+    'LeaveIndex',
+    'LeavePolicy',
+    'LeaveRequest',
+    'LeaveService',
+    'LeaveStore',
+    'Metrics',
+    'MonthlyAvailabilityCache',
+    'ReferenceCache',
+    'ReferenceData',
+    'WellnessAnalyzer',
+    'WorkdayCalendar',
+    'get_figure_cache',
+    'get_metrics',
+    'get_reference_cache',
+    'get_service',
+    'get_store',
+]
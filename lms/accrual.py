@@ -0,0 +1,217 @@
+"""Year-end rollover and monthly accrual batch jobs over the whole workforce.
+
+Sick and personal leave are granted when an employee's year opens, pro
+rata to the part of the year they are employed.  Annual leave accrues
+monthly at a twelfth of the allowance, the hire month counting pro rata by
+day.  Both jobs work on NumPy arrays for every employee at once and write
+the resulting ledger entries in chunks, one transaction each.
+
+Each job reads what the ledger already holds before writing, so running it
+twice changes nothing and a run that stopped part way through is finished
+by running it again.  A year counts as closed once its year-end entries
+are in the ledger, and accrual closes the previous year first if it is
+still open, so the two jobs can run in either order.  Run them alongside the app with::
+
+    python -m lms.accrual accrue [--as-of YYYY-MM-DD]
+    python -m lms.accrual year-end YEAR
+"""
+
+import argparse
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+from lms.ledger import LEAVE_BUCKETS
+from lms.storage import DEFAULT_DB_PATH, LeaveStore
+
+BUCKETS = list(LEAVE_BUCKETS) + list(LEAVE_BUCKETS.values())
+CHUNK_SIZE = 10000
+
+
+class _Workforce:
+    """Employees as parallel arrays: ids, hire dates and their policy's allowances"""
+
+    def __init__(self, employees, policies):
+        employees = list(employees)
+        self.ids = np.array([emp.id for emp in employees], dtype=object)
+        self.hire_dates = np.array([emp.hire_date for emp in employees], dtype='datetime64[D]')
+        names = list(policies)
+        allowances = np.array([[p.annual_days, p.sick_days, p.personal_days, p.carryover_limit]
+                               for p in policies.values()], dtype=np.float64).reshape(-1, 4)
+        codes = np.array([names.index(emp.policy) for emp in employees], dtype=np.int64)
+        self.annual, self.sick, self.personal, self.carryover_limit = allowances[codes].T
+
+    def __len__(self):
+        return len(self.ids)
+
+    def has(self, totals):
+        """Whether each employee has an entry in ``totals``"""
+        return np.array([emp_id in totals for emp_id in self.ids], dtype=bool)
+
+    def lookup(self, totals, bucket=None):
+        """``totals[employee]`` (or ``totals[employee][bucket]``) for every employee, 0 where missing"""
+        if bucket is None:
+            return np.array([totals.get(emp_id, 0) for emp_id in self.ids], dtype=np.float64)
+        return np.array([totals.get(emp_id, {}).get(bucket, 0) for emp_id in self.ids], dtype=np.float64)
+
+
+def _year_fraction(hire_dates, year):
+    """Share of ``year`` each employee is employed for"""
+    start, end = np.datetime64(f'{year:04d}-01-01'), np.datetime64(f'{year + 1:04d}-01-01')
+    employed = (end - np.maximum(hire_dates, start)).astype(np.int64)
+    return np.clip(employed / (end - start).astype(np.int64), 0, 1)
+
+
+def _accrued_months(hire_dates, year, month):
+    """Months of annual leave earned in ``year`` up to the end of ``month``, the hire month pro rata by day"""
+    first = np.datetime64(f'{year:04d}-01', 'M')
+    last = first + (month - 1)
+    hire_months = hire_dates.astype('datetime64[M]')
+    next_months = (hire_months + 1).astype('datetime64[D]')
+    partial = ((next_months - hire_dates).astype(np.int64)
+               / (next_months - hire_months.astype('datetime64[D]')).astype(np.int64))
+    months = np.where(hire_months < first, (last - first).astype(np.int64) + 1,
+                      (last - hire_months).astype(np.int64) + partial)
+    return np.clip(months, 0, 12)
+
+
+def _rows(ids, bucket, kind, days, effective_dates, keep=None):
+    """Ledger rows for one bucket and kind, skipping zero changes unless ``keep`` says otherwise"""
+    keep = days != 0 if keep is None else keep
+    return list(zip(ids[keep], [bucket] * int(keep.sum()), [kind] * int(keep.sum()),
+                    np.round(days[keep], 2).tolist(), [None] * int(keep.sum()),
+                    effective_dates[keep].astype('datetime64[s]').astype(object)))
+
+
+def _opening_rows(workforce, selected, year):
+    """Grants opening ``year`` for the ``selected`` employees: pro rata sick and personal leave.
+
+    Both grants are written even at zero days, since they are what marks
+    the year as opened.
+    """
+    ids = workforce.ids[selected]
+    hire_dates = workforce.hire_dates[selected]
+    effective = np.maximum(hire_dates, np.datetime64(f'{year:04d}-01-01'))
+    fraction = _year_fraction(hire_dates, year)
+    opened = np.ones(len(ids), dtype=bool)
+    rows = _rows(ids, 'Sick Leave', 'grant', workforce.sick[selected] * fraction, effective, opened)
+    rows += _rows(ids, 'Personal Leave', 'grant', workforce.personal[selected] * fraction, effective, opened)
+    return rows
+
+
+def _write_chunks(store, count, build, chunk_size):
+    """Write ``build(positions)`` for successive chunks of employees, one transaction each"""
+    for start in range(0, count, chunk_size):
+        rows = build(slice(start, start + chunk_size))
+        if rows:
+            store.append_ledger_rows(rows)
+
+
+def run_accrual(store, policies, employees, as_of, chunk_size=CHUNK_SIZE):
+    """Bring every employee's entitlement for ``as_of``'s year up to date through ``as_of``'s month.
+
+    Employees whose year has not been opened yet get their pro rata sick
+    and personal leave grant.  Annual leave is topped up to what has
+    accrued so far, less whatever was already granted or accrued in the
+    year, so the accrual for a month is never paid twice.  If the previous
+    year was opened but not closed, ``run_year_end`` closes it first.
+    Returns the number of employees updated.
+    """
+    year = as_of.year
+    workforce = _Workforce(employees, policies)
+    previous = store.entitlements('Annual Leave', datetime(year - 1, 1, 1), datetime(year, 1, 1))
+    if (workforce.has(previous) & ~workforce.has(store.closed_employees(year - 1))).any():
+        run_year_end(store, policies, employees, year - 1, chunk_size, today=as_of)
+    credited = store.entitlements('Annual Leave', datetime(year, 1, 1), datetime(year + 1, 1, 1))
+    months = _accrued_months(workforce.hire_dates, year, as_of.month)
+    employed = months > 0
+    to_open = employed & ~workforce.has(credited)
+    accrued = np.round(workforce.annual * months / 12, 2)
+    top_up = np.where(employed, accrued - workforce.lookup(credited), 0)
+    to_accrue = top_up >= 0.01
+    effective = np.maximum(workforce.hire_dates, np.datetime64(date(year, as_of.month, 1)))
+
+    def build(chunk):
+        ids = workforce.ids[chunk]
+        rows = _opening_rows(workforce, np.flatnonzero(to_open[chunk]) + chunk.start, year)
+        rows += _rows(ids, 'Annual Leave', 'accrue', top_up[chunk], effective[chunk], to_accrue[chunk])
+        return rows
+
+    _write_chunks(store, len(workforce), build, chunk_size)
+    return int((to_open | to_accrue).sum())
+
+
+def run_year_end(store, policies, employees, year, chunk_size=CHUNK_SIZE, today=None):
+    """Close ``year`` for every employee and open ``year + 1``.
+
+    Unused annual leave carries over up to the policy's ``carryover_limit``
+    and the rest expires (an overdrawn balance carries over in full);
+    unused sick and personal leave expire, usage counters reset to zero,
+    and the new year opens with its sick and personal grants.  Annual leave
+    for the new year comes from ``run_accrual``.  The carryover entry is
+    written even at zero days, since it is what marks the year as closed;
+    employees already closed are skipped.  Entries already effective in the
+    new year (its grants, accruals and approved leave) are left out of the
+    closing balance, and grants are not repeated.  Raises ``ValueError`` for
+    a year that has not ended by ``today`` (default: the current date).
+    Returns the number of employees rolled over.
+    """
+    if year >= (today or date.today()).year:
+        raise ValueError(f"Year {year} has not ended yet")
+    workforce = _Workforce(employees, policies)
+    next_year = datetime(year + 1, 1, 1)
+    opened = store.entitlements('Annual Leave', next_year, datetime(year + 2, 1, 1))
+    to_roll = (_year_fraction(workforce.hire_dates, year + 1) > 0) & ~workforce.has(store.closed_employees(year))
+    to_open = to_roll & ~workforce.has(opened)
+    balances, later = store.load_balances(), store.balances_from(next_year)
+    closing = np.column_stack([workforce.lookup(balances, bucket) - workforce.lookup(later, bucket)
+                               for bucket in BUCKETS])
+    carried = np.minimum(closing[:, 0], workforce.carryover_limit)
+    effective = np.full(len(workforce), np.datetime64(f'{year + 1:04d}-01-01'))
+
+    def build(chunk):
+        selected = to_roll[chunk]
+        ids = workforce.ids[chunk]
+        rows = []
+        for column, bucket in enumerate(BUCKETS):
+            rows += _rows(ids, bucket, 'expire', -closing[chunk, column], effective[chunk],
+                          selected & (closing[chunk, column] != 0))
+        rows += _rows(ids, 'Annual Leave', 'carryover', carried[chunk], effective[chunk], selected)
+        return rows + _opening_rows(workforce, np.flatnonzero(to_open[chunk]) + chunk.start, year + 1)
+
+    _write_chunks(store, len(workforce), build, chunk_size)
+    return int(to_roll.sum())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m lms.accrual', description="Leave balance batch jobs")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="SQLite database (default: %(default)s)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="employees written per transaction (default: %(default)s)")
+    jobs = parser.add_subparsers(dest='job', required=True)
+    accrue = jobs.add_parser('accrue', help="open the year and accrue annual leave through a month")
+    accrue.add_argument('--as-of', type=date.fromisoformat, default=date.today(),
+                        help="accrue through this date's month (default: today)")
+    year_end = jobs.add_parser('year-end', help="carry over and expire balances, then open the next year")
+    year_end.add_argument('year', type=int, help="the year being closed")
+    args = parser.parse_args(argv)
+
+    store = LeaveStore(args.db)
+    try:
+        policies, employees = store.load_policies(), store.load_employees()
+        started = time.perf_counter()
+        if args.job == 'accrue':
+            updated = run_accrual(store, policies, employees, args.as_of, args.chunk_size)
+        else:
+            updated = run_year_end(store, policies, employees, args.year, args.chunk_size)
+        print(f"{args.job}: updated {updated} of {len(employees)} employees "
+              f"in {time.perf_counter() - started:.2f}s")
+    except ValueError as exc:
+        parser.error(str(exc))
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
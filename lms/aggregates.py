@@ -0,0 +1,77 @@
+"""Incrementally maintained leave counters for dashboards and the sidebar."""
+
+from collections import Counter, defaultdict
+
+
+class LeaveAggregates:
+    """Per-employee and per-manager counters kept in step with leave requests.
+
+    Tracks pending requests per employee, pending approvals per manager,
+    and approved days per employee, start year and leave type.  Follows the same ``add`` / ``reindex`` /
+    ``remove`` protocol as ``LeaveIndex`` so both can be updated together.
+    """
+
+    def __init__(self, directory, requests=()):
+        self._directory = directory
+        self._pending = Counter()
+        self._pending_approvals = Counter()
+        self._used_days = defaultdict(Counter)
+        self._entries = {}
+        for request in requests:
+            self.add(request)
+
+    def add(self, request):
+        if id(request) in self._entries:
+            self.remove(request)
+        emp = self._directory.get(request.employee_id)
+        manager_id = emp.manager_id if emp else None
+        entry = (request.status, request.employee_id, manager_id,
+                 request.leave_type, request.days, request.start_date.year)
+        self._apply(entry, 1)
+        self._entries[id(request)] = entry
+
+    def remove(self, request):
+        entry = self._entries.pop(id(request), None)
+        if entry is not None:
+            self._apply(entry, -1)
+
+    def reindex(self, request):
+        self.remove(request)
+        self.add(request)
+
+    def rebind(self, directory):
+        """Look managers up in ``directory`` from now on, moving pending approvals of anyone whose manager changed"""
+        self._directory = directory
+        for key, entry in self._entries.items():
+            status, employee_id, manager_id = entry[:3]
+            emp = directory.get(employee_id)
+            new_manager_id = emp.manager_id if emp else None
+            if new_manager_id != manager_id:
+                if status == 'Pending':
+                    self._pending_approvals[manager_id] -= 1
+                    self._pending_approvals[new_manager_id] += 1
+                self._entries[key] = (status, employee_id, new_manager_id) + entry[3:]
+
+    def _apply(self, entry, sign):
+        status, employee_id, manager_id, leave_type, days, start_year = entry
+        if status == 'Pending':
+            self._pending[employee_id] += sign
+            self._pending_approvals[manager_id] += sign
+        elif status == 'Approved':
+            self._used_days[employee_id][start_year, leave_type] += sign * days
+
+    def pending_count(self, employee_id):
+        """Pending requests submitted by an employee"""
+        return self._pending[employee_id]
+
+    def pending_approvals(self, manager_id):
+        """Pending requests waiting on a manager"""
+        return self._pending_approvals[manager_id]
+
+    def used_days(self, employee_id, leave_type=None, year=None):
+        """Approved days for an employee, for one leave type or by type; ``year`` counts leaves starting in it"""
+        used = Counter()
+        for (start_year, kind), days in self._used_days.get(employee_id, {}).items():
+            if year is None or start_year == year:
+                used[kind] += days
+        return used[leave_type] if leave_type else dict(used)
@@ -0,0 +1,276 @@
+"""Async HTTP/JSON API over ``LeaveService`` for HRIS integrations, chat bots and mobile clients.
+
+Serve it next to the Streamlit app with::
+
+    python -m lms.api [--host 127.0.0.1] [--port 8000] [--db leave_management.db]
+
+Like the app, the API trusts the employee and approver ids it is given;
+put it behind the gateway that authenticates callers.  Dates are ISO
+``YYYY-MM-DD`` strings.
+
+    GET    /health
+    GET    /employees/{employee_id}/balances
+    GET    /employees/{employee_id}/requests?status=&leave_type=&year=&limit=&offset=
+    POST   /validate                   one request's fields, or a list of them
+    POST   /requests                   submit; 422 with the errors if policy refuses it
+    GET    /requests/{request_id}
+    DELETE /requests/{request_id}      cancel a pending request
+    POST   /requests/{request_id}/review
+    GET    /approvals/{approver_id}    pending requests with their validation
+    GET    /metrics?format=json        timings, when enabled with LMS_METRICS=1 (Prometheus text by default)
+"""
+
+import argparse
+from datetime import date, datetime
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from lms.ledger import LEAVE_BUCKETS
+from lms.metrics import get_metrics
+from lms.models import LeaveRequest
+from lms.service import get_service
+from lms.storage import DEFAULT_DB_PATH, ConcurrentUpdateError, get_store
+
+STATUSES = ['Pending', 'Approved', 'Rejected']
+
+
+def _request_json(request):
+    return {
+        'id': request.id,
+        'employee_id': request.employee_id,
+        'leave_type': request.leave_type,
+        'start_date': request.start_date.date().isoformat(),
+        'end_date': request.end_date.date().isoformat(),
+        'days': request.days,
+        'reason': request.reason,
+        'status': request.status,
+        'submitted_date': request.submitted_date.isoformat(),
+        'approver_id': request.approver_id,
+        'approved_date': request.approved_date.isoformat() if request.approved_date else None,
+        'comments': request.comments,
+    }
+
+
+def _parse_date(body, field):
+    try:
+        return datetime.combine(date.fromisoformat(body[field]), datetime.min.time())
+    except KeyError:
+        raise HTTPException(400, f"Missing field: {field}")
+    except (TypeError, ValueError):
+        raise HTTPException(400, f"Invalid date for {field}: {body[field]!r}")
+
+
+def _leave_fields(service, body):
+    """``(employee_id, leave_type, start_date, end_date)`` from a JSON object, checked"""
+    if not isinstance(body, dict):
+        raise HTTPException(400, "Expected a JSON object")
+    employee_id = body.get('employee_id')
+    if service.employee(employee_id) is None:
+        raise HTTPException(404, f"Unknown employee: {employee_id}")
+    leave_type = body.get('leave_type')
+    if leave_type not in LEAVE_BUCKETS:
+        raise HTTPException(400, f"leave_type must be one of {list(LEAVE_BUCKETS)}")
+    start_date, end_date = _parse_date(body, 'start_date'), _parse_date(body, 'end_date')
+    if end_date < start_date:
+        raise HTTPException(400, "end_date is before start_date")
+    return employee_id, leave_type, start_date, end_date
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body is not valid JSON")
+
+
+def _service(request):
+    """The app's service, brought up to date with the store"""
+    service = request.app.state.service
+    service.refresh()
+    return service
+
+
+def _existing_request(service, request_id):
+    leave = service.request(request_id)
+    if leave is None:
+        raise HTTPException(404, f"Unknown request: {request_id}")
+    return leave
+
+
+async def health(request):
+    service = await run_in_threadpool(_service, request)
+    return JSONResponse({'status': 'ok', 'requests': len(service.requests)})
+
+
+async def balances(request):
+    employee_id = request.path_params['employee_id']
+
+    def load():
+        service = _service(request)
+        if service.employee(employee_id) is None:
+            raise HTTPException(404, f"Unknown employee: {employee_id}")
+        return service.balance(employee_id)
+
+    return JSONResponse(await run_in_threadpool(load))
+
+
+async def employee_requests(request):
+    employee_id = request.path_params['employee_id']
+    params = request.query_params
+    try:
+        year = int(params['year']) if 'year' in params else None
+        limit, offset = int(params.get('limit', 50)), int(params.get('offset', 0))
+    except ValueError:
+        raise HTTPException(400, "year, limit and offset must be integers")
+    statuses = params.getlist('status') or STATUSES
+    leave_types = params.getlist('leave_type') or list(LEAVE_BUCKETS)
+
+    def load():
+        service = _service(request)
+        return service.store.page_requests(employee_id, statuses, leave_types, year,
+                                           limit=min(limit, 500), offset=offset)
+
+    return JSONResponse([_request_json(lr) for lr in await run_in_threadpool(load)])
+
+
+async def validate(request):
+    body = await _json_body(request)
+
+    def check():
+        service = _service(request)
+        if isinstance(body, list):
+            leaves = [LeaveRequest(None, employee_id, leave_type, start_date, end_date, 0, '', 'Pending',
+                                   datetime.now())
+                      for employee_id, leave_type, start_date, end_date in
+                      (_leave_fields(service, item) for item in body)]
+            coverage = service.team_coverage_batch(leaves)
+            results = service.validate_requests(leaves, coverage)
+            return [{'working_days': service.working_days(lr.start_date, lr.end_date), 'coverage': cov,
+                     'overlapping': overlapping, 'errors': errors, 'warnings': warnings}
+                    for lr, (cov, overlapping), (errors, warnings) in zip(leaves, coverage, results)]
+        employee_id, leave_type, start_date, end_date = _leave_fields(service, body)
+        coverage, overlapping = service.team_coverage(employee_id, start_date, end_date)
+        errors, warnings = service.validate_request(employee_id, leave_type, start_date, end_date)
+        return {'working_days': service.working_days(start_date, end_date), 'coverage': coverage,
+                'overlapping': len(overlapping), 'errors': errors, 'warnings': warnings}
+
+    return JSONResponse(await run_in_threadpool(check))
+
+
+async def submit(request):
+    body = await _json_body(request)
+
+    def create():
+        service = _service(request)
+        fields = _leave_fields(service, body)
+        reason = body.get('reason')
+        if not reason:
+            raise HTTPException(400, "Missing field: reason")
+        return service.request_leave(*fields, reason)
+
+    leave, errors, warnings = await run_in_threadpool(create)
+    if leave is None:
+        return JSONResponse({'errors': errors, 'warnings': warnings}, status_code=422)
+    return JSONResponse({'request': _request_json(leave), 'warnings': warnings}, status_code=201)
+
+
+async def get_request(request):
+    def load():
+        return _existing_request(_service(request), request.path_params['request_id'])
+
+    return JSONResponse(_request_json(await run_in_threadpool(load)))
+
+
+async def cancel(request):
+    def withdraw():
+        service = _service(request)
+        service.cancel_request(_existing_request(service, request.path_params['request_id']))
+
+    try:
+        await run_in_threadpool(withdraw)
+    except ConcurrentUpdateError:
+        raise HTTPException(409, "Only pending requests can be cancelled")
+    return Response(status_code=204)
+
+
+async def review(request):
+    body = await _json_body(request)
+    if not isinstance(body, dict) or body.get('status') not in ('Approved', 'Rejected'):
+        raise HTTPException(400, "status must be 'Approved' or 'Rejected'")
+
+    def decide():
+        service = _service(request)
+        leave = _existing_request(service, request.path_params['request_id'])
+        approver_id = body.get('approver_id')
+        if service.employee(leave.employee_id).manager_id != approver_id:
+            raise HTTPException(403, f"{approver_id} does not approve requests from {leave.employee_id}")
+        return service.review_requests([leave], body['status'], approver_id, body.get('comments', ''))[0]
+
+    try:
+        leave = await run_in_threadpool(decide)
+    except ConcurrentUpdateError:
+        raise HTTPException(409, "The request is no longer pending")
+    return JSONResponse(_request_json(leave))
+
+
+async def approvals(request):
+    def load():
+        service = _service(request)
+        pending = service.pending_approvals(request.path_params['approver_id'])
+        coverage = service.team_coverage_batch(pending)
+        results = service.validate_requests(pending, coverage)
+        return [{'request': _request_json(lr), 'coverage': cov, 'overlapping': overlapping,
+                 'errors': errors, 'warnings': warnings}
+                for lr, (cov, overlapping), (errors, warnings) in zip(pending, coverage, results)]
+
+    return JSONResponse(await run_in_threadpool(load))
+
+
+async def metrics(request):
+    if request.query_params.get('format') == 'json':
+        return Response(get_metrics().to_json(), media_type='application/json')
+    return PlainTextResponse(get_metrics().to_prometheus(), media_type='text/plain; version=0.0.4')
+
+
+async def http_error(request, exc):
+    return JSONResponse({'error': exc.detail}, status_code=exc.status_code)
+
+
+def create_app(service):
+    """ASGI app serving ``service``; blocking store and service calls run in the thread pool"""
+    app = Starlette(
+        routes=[
+            Route('/health', health),
+            Route('/employees/{employee_id}/balances', balances),
+            Route('/employees/{employee_id}/requests', employee_requests),
+            Route('/validate', validate, methods=['POST']),
+            Route('/requests', submit, methods=['POST']),
+            Route('/requests/{request_id}', get_request),
+            Route('/requests/{request_id}', cancel, methods=['DELETE']),
+            Route('/requests/{request_id}/review', review, methods=['POST']),
+            Route('/approvals/{approver_id}', approvals),
+            Route('/metrics', metrics),
+        ],
+        exception_handlers={HTTPException: http_error},
+    )
+    app.state.service = service
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog='python -m lms.api', description="Leave management HTTP API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="SQLite database (default: %(default)s)")
+    args = parser.parse_args(argv)
+    uvicorn.run(create_app(get_service(get_store(args.db))), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
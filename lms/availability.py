@@ -0,0 +1,138 @@
+"""Employee-by-day absence matrix for availability views."""
+
+import calendar
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+
+class AvailabilityMatrix:
+    """Dense employee x day matrix of who is on leave over a date window.
+
+    Built from a difference array: each leave adds +1 on its first day and
+    -1 the day after its last, per employee row, and a cumulative sum along
+    the day axis turns that into per-day leave counts.  No Python loop runs
+    per day, so a full year for tens of thousands of employees stays cheap
+    (one byte per employee-day).
+    """
+
+    def __init__(self, employee_ids, start_date, end_date, leaves):
+        self.employee_ids = list(employee_ids)
+        self.start_date = start_date
+        self.num_days = max((end_date.date() - start_date.date()).days + 1, 0)
+        row_of = {emp_id: row for row, emp_id in enumerate(self.employee_ids)}
+
+        rows, firsts, lasts = [], [], []
+        for leave in leaves:
+            row = row_of.get(leave.employee_id)
+            if row is None:
+                continue
+            rows.append(row)
+            firsts.append((leave.start_date.date() - start_date.date()).days)
+            lasts.append((leave.end_date.date() - start_date.date()).days)
+
+        diff = np.zeros((len(self.employee_ids), self.num_days + 1), dtype=np.int16)
+        if rows:
+            rows = np.array(rows)
+            firsts = np.clip(firsts, 0, self.num_days)
+            ends = np.clip(np.array(lasts) + 1, 0, self.num_days)
+            keep = firsts < ends
+            np.add.at(diff, (rows[keep], firsts[keep]), 1)
+            np.add.at(diff, (rows[keep], ends[keep]), -1)
+        self.absent = np.cumsum(diff, axis=1, dtype=np.int16)[:, :self.num_days] > 0
+
+    @property
+    def dates(self):
+        import pandas as pd
+
+        return pd.date_range(self.start_date.date(), periods=self.num_days, freq='D')
+
+    def on_leave_counts(self):
+        """Employees on leave for each day of the window"""
+        return self.absent.sum(axis=0)
+
+    def available_counts(self):
+        return len(self.employee_ids) - self.on_leave_counts()
+
+    def absent_on(self, day):
+        """Ids of employees on leave on ``day``"""
+        col = (day.date() - self.start_date.date()).days
+        if not 0 <= col < self.num_days:
+            return []
+        return [self.employee_ids[row] for row in np.flatnonzero(self.absent[:, col])]
+
+    def daily_frame(self):
+        """Per-day Available / On Leave / Availability % frame for charts"""
+        import pandas as pd
+
+        on_leave = self.on_leave_counts()
+        available = len(self.employee_ids) - on_leave
+        headcount = len(self.employee_ids)
+        availability_pct = available / headcount * 100 if headcount else np.full(self.num_days, 100.0)
+        return pd.DataFrame({
+            'Date': self.dates,
+            'Available': available,
+            'On Leave': on_leave,
+            'Availability %': availability_pct
+        })
+
+
+def month_bounds(year, month):
+    """First and last day of a calendar month, as datetimes"""
+    last_day = calendar.monthrange(year, month)[1]
+    return datetime(year, month, 1), datetime(year, month, last_day)
+
+
+def shift_month(year, month, offset):
+    """The (year, month) ``offset`` months away"""
+    index = year * 12 + month - 1 + offset
+    return index // 12, index % 12 + 1
+
+
+class MonthlyAvailabilityCache:
+    """Availability frames per calendar month, built on first view and reused.
+
+    A multi-month calendar window is stitched together from month chunks, and
+    each chunk only fetches the leaves overlapping that month, so widening or
+    paging the window computes just the months not seen yet.  Everything is
+    dropped when ``token`` (the caller's data revision) changes, and the
+    least recently used months are evicted beyond ``max_months``.
+    """
+
+    def __init__(self, max_months=60):
+        self.max_months = max_months
+        self._token = None
+        self._months = OrderedDict()
+
+    def month(self, token, scope, employee_ids, year, month, fetch_leaves):
+        """(leaves, daily frame) for one month; ``fetch_leaves(start, end)`` loads leaves"""
+        if token != self._token:
+            self._months.clear()
+            self._token = token
+        key = (scope, year, month)
+        if key in self._months:
+            self._months.move_to_end(key)
+            return self._months[key]
+        start, end = month_bounds(year, month)
+        leaves = fetch_leaves(start, end)
+        entry = (leaves, AvailabilityMatrix(employee_ids, start, end, leaves).daily_frame())
+        self._months[key] = entry
+        while len(self._months) > self.max_months:
+            self._months.popitem(last=False)
+        return entry
+
+    def window(self, token, scope, employee_ids, year, month, months, fetch_leaves):
+        """(distinct leaves, daily frame) for ``months`` consecutive months from (year, month)"""
+        import pandas as pd
+
+        leaves, frames, seen = [], [], set()
+        for offset in range(months):
+            month_leaves, frame = self.month(token, scope, employee_ids,
+                                             *shift_month(year, month, offset), fetch_leaves)
+            frames.append(frame)
+            for leave in month_leaves:
+                if id(leave) not in seen:
+                    seen.add(id(leave))
+                    leaves.append(leave)
+        return leaves, pd.concat(frames, ignore_index=True)
@@ -0,0 +1,307 @@
+"""Benchmarks of the domain engines and each page's data preparation on synthetic workforces.
+
+Each size gets a fresh SQLite database seeded by ``generate_workforce``
+with a year's accrual run, and every benchmark is timed over a few
+repetitions with fresh caches, so it measures the cold path a page pays
+after the data changes.  Cold start is timed separately, in fresh
+interpreters importing the API and rendering the app's first page on the
+demo data.  Results are written as JSON; pass an earlier run as
+``--baseline`` to fail on regressions::
+
+    python -m lms.benchmark [--sizes 1000 10000 100000] [--output benchmark.json]
+                            [--baseline previous.json] [--tolerance 1.25] [--no-startup]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from lms import pages
+from lms.accrual import run_accrual
+from lms.availability import MonthlyAvailabilityCache
+from lms.forecast import forecast_absences
+from lms.service import LeaveService
+from lms.storage import LeaveStore
+from lms.synthetic import generate_workforce
+from lms.wellness import WellnessAnalyzer
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+SAMPLE = 50
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+# Modules whose import dominates cold start; each startup result lists which of them it loaded
+HEAVY_MODULES = ('numpy', 'pandas', 'plotly', 'pyarrow')
+
+_REPORT_MODULES = f"import json, sys; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+
+STARTUP = {
+    'import_api': "import lms.api",
+    'app_first_page': (
+        "from streamlit.testing.v1 import AppTest\n"
+        f"at = AppTest.from_file({APP_PATH!r}, default_timeout=300).run()\n"
+        "assert not at.exception, at.exception\n"
+    ),
+}
+
+
+def _time(function, repeat):
+    """Wall-clock milliseconds of ``repeat`` calls to ``function``"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _startup(code, repeat, env):
+    """Wall-clock milliseconds of ``repeat`` fresh interpreters running ``code``, with the heavy modules it loaded"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', f"{code}\n{_REPORT_MODULES}"], env=env,
+                                   capture_output=True, text=True, check=True)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, json.loads(completed.stdout.splitlines()[-1])
+
+
+def _startup_benchmarks(repeat, directory=None):
+    """Cold-start results: the API import and the app's first page render on a seeded demo database"""
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as workdir:
+        env = dict(os.environ, LMS_DB_PATH=os.path.join(workdir, 'startup.db'),
+                   PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(APP_PATH),
+                                                            os.environ.get('PYTHONPATH')])))
+        env.pop('LMS_METRICS', None)
+        # The first run seeds the demo database, which is not part of a pod's cold start
+        _startup(STARTUP['app_first_page'], 1, env)
+        for name, code in STARTUP.items():
+            timings, loaded = _startup(code, repeat, env)
+            results.append(_result(None, 'startup', name, timings, loaded=loaded))
+    return results
+
+
+def _result(employees, group, name, timings, **details):
+    return {'employees': employees, 'group': group, 'name': name, 'runs': len(timings),
+            'best_ms': round(min(timings), 3), 'median_ms': round(statistics.median(timings), 3),
+            **details}
+
+
+class _Subject:
+    """A seeded store and service for one workforce size, with the samples benchmarks work on"""
+
+    def __init__(self, path, employees, years, seed):
+        self.today = datetime.now()
+        policies, people, requests, holidays = generate_workforce(employees, years=years, today=self.today,
+                                                                  seed=seed)
+        self.setup = {}
+        started = time.perf_counter()
+        self.store = LeaveStore(path)
+        self.store.seed(policies, people, requests, holidays)
+        self.setup['seed_store'] = time.perf_counter() - started
+        started = time.perf_counter()
+        run_accrual(self.store, policies, people, self.today)
+        self.setup['run_accrual'] = time.perf_counter() - started
+        started = time.perf_counter()
+        self.service = LeaveService(self.store)
+        self.setup['load_service'] = time.perf_counter() - started
+        self.requests = len(requests)
+        # A second connection stands in for another process writing to the database
+        self.other_store = LeaveStore(path)
+
+        rng = np.random.default_rng(seed)
+        directory = self.service.reference.employees
+        staff = [emp for emp in directory if not directory.is_manager(emp.id)]
+        self.employees = [staff[i] for i in rng.choice(len(staff), size=min(SAMPLE, len(staff)), replace=False)]
+        self.employee = self.employees[0]
+        held = list(self.service.requests.values())
+        self.leaves = [held[i] for i in rng.choice(len(held), size=min(SAMPLE, len(held)), replace=False)]
+        self.approver = self.employee.manager_id
+        self.pending = [lr for lr in held if lr.status == 'Pending']
+
+    def close(self):
+        self.other_store.close()
+        self.store.close()
+
+
+def _domain_benchmarks(subject):
+    """(name, function, details) for the service's domain operations"""
+    service = subject.service
+    reference = service.reference
+    starts = [lr.start_date for lr in service.requests.values()]
+    ends = [lr.end_date for lr in service.requests.values()]
+
+    def working_days():
+        for lr in subject.leaves:
+            service.working_days(lr.start_date, lr.end_date)
+
+    def team_coverage():
+        for lr in subject.leaves:
+            service.team_coverage(lr.employee_id, lr.start_date, lr.end_date)
+
+    def catch_up():
+        subject.other_store.update_request(service.request(subject.leaves[0].id))
+        service.refresh()
+
+    def sick_leave_patterns():
+        wellness = WellnessAnalyzer(service.history)
+        for emp in subject.employees:
+            wellness.pattern(emp.id)
+
+    return [
+        ('working_days', working_days, {'calls': len(subject.leaves)}),
+        ('working_days_batch', lambda: reference.workday_calendar.count_many(starts, ends),
+         {'rows': len(starts)}),
+        ('team_coverage', team_coverage, {'calls': len(subject.leaves)}),
+        ('team_coverage_batch', lambda: service.team_coverage_batch(subject.pending), {'rows': len(subject.pending)}),
+        ('validate_requests', lambda: service.validate_requests(subject.pending), {'rows': len(subject.pending)}),
+        ('sick_leave_pattern', sick_leave_patterns, {'calls': len(subject.employees)}),
+        ('wellness_alerts', lambda: WellnessAnalyzer(service.history).alerts(), {}),
+        ('absence_forecast', lambda: forecast_absences(service.history, reference.employees,
+                                                       reference.workday_calendar, subject.today), {}),
+        ('catch_up_write', catch_up, {'rows': 1}),
+        ('reload_service', lambda: (service.invalidate(), service.refresh()), {'rows': subject.requests}),
+    ]
+
+
+def _page_benchmarks(subject):
+    """(name, function, details) running each page's data preparation from ``lms.pages``, with cold caches"""
+    service = subject.service
+    store = subject.store
+    emp = subject.employee
+    today = subject.today
+
+    def cold(prepare):
+        def run():
+            service.clear_caches()
+            prepare()
+        return run
+
+    def dashboard():
+        pages.dashboard(service, emp, today)
+        pages.availability_outlook(service, [emp.department], today)
+
+    def my_requests():
+        filters = (emp.id, ('Pending', 'Approved'), ('Annual Leave', 'Sick Leave', 'Personal Leave'),
+                   (store.request_years(emp.id) or [today.year])[0])
+        pages.request_summary(store, *filters)
+        pages.request_page(store, *filters, 1, 10)
+
+    def team_calendar(view):
+        def prepare():
+            employees = pages.calendar_employees(service.reference.employees, view, emp)
+            pages.calendar_window(service, MonthlyAvailabilityCache(), view, emp, employees,
+                                  today.year, today.month, 12)
+        return prepare
+
+    def reports():
+        pages.report_file(store, department=emp.department, start=today - timedelta(days=365), end=today).close()
+
+    return [
+        ('dashboard', cold(dashboard), {}),
+        ('my_requests', my_requests, {}),
+        ('approvals', cold(lambda: pages.approval_queue(service, subject.approver)), {'approver': subject.approver}),
+        ('team_calendar_department', team_calendar('Department'), {'months': 12}),
+        ('team_calendar_company', team_calendar('All Employees'), {'months': 12}),
+        ('analytics_company', lambda: pages.usage_trends(service, by_department=True), {}),
+        ('department_report', reports, {}),
+    ]
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=5, years=3, seed=0, directory=None, log=None, startup=True):
+    """Benchmark results for every workforce size, and for cold start unless not ``startup``, as a list of dicts"""
+    results = []
+    if startup:
+        for result in _startup_benchmarks(repeat, directory):
+            results.append(result)
+            if log:
+                log(result)
+    for employees in sizes:
+        with tempfile.TemporaryDirectory(dir=directory) as workdir:
+            subject = _Subject(os.path.join(workdir, 'benchmark.db'), employees, years, seed)
+            try:
+                for name, seconds in subject.setup.items():
+                    results.append(_result(employees, 'setup', name, [seconds * 1000], rows=subject.requests))
+                for group, benchmarks in (('domain', _domain_benchmarks(subject)),
+                                          ('page', _page_benchmarks(subject))):
+                    for name, function, details in benchmarks:
+                        results.append(_result(employees, group, name, _time(function, repeat), **details))
+                        if log:
+                            log(results[-1])
+            finally:
+                subject.close()
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """Results slower than the baseline's same benchmark by more than ``tolerance`` times, with its timing.
+
+    Benchmarks whose workload differs from the baseline's (another number
+    of calls or rows) are not compared.
+    """
+    previous = {(r['employees'], r['group'], r['name']): r for r in baseline['results']}
+    slower = []
+    for result in results:
+        before = previous.get((result['employees'], result['group'], result['name']))
+        if (result['group'] == 'setup' or before is None
+                or (before.get('calls'), before.get('rows')) != (result.get('calls'), result.get('rows'))):
+            continue
+        if result['best_ms'] > before['best_ms'] * tolerance:
+            slower.append((result, before['best_ms']))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m lms.benchmark', description="Leave management benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="workforce sizes to benchmark (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark (default: %(default)s)")
+    parser.add_argument('--years', type=int, default=3, help="years of leave history (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark.json', help="results file (default: %(default)s)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="slowdown against the baseline counted as a regression (default: %(default)s)")
+    parser.add_argument('--no-startup', dest='startup', action='store_false', help="skip the cold-start timings")
+    args = parser.parse_args(argv)
+
+    def log(result):
+        print(f"{result['employees'] or '-':>8} {result['group']:<7} {result['name']:<26} "
+              f"best {result['best_ms']:>10.2f} ms  median {result['median_ms']:>10.2f} ms", flush=True)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.years, args.seed, log=log, startup=args.startup)
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'config': {'sizes': args.sizes, 'repeat': args.repeat, 'years': args.years, 'seed': args.seed,
+                   'startup': args.startup},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        for result, before in slower:
+            print(f"REGRESSION {result['employees'] or '-'} {result['group']}/{result['name']}: "
+                  f"{before:.2f} ms -> {result['best_ms']:.2f} ms")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Team coverage for many leave requests at once."""
+
+from collections import defaultdict
+
+import numpy as np
+
+
+def _to_times(dates):
+    return np.array(dates, dtype='datetime64[us]')
+
+
+def _overlap_counts(leave_starts, leave_ends, starts, ends):
+    """For each window, how many leaves intersect it.
+
+    A leave misses ``[s, e]`` only if it starts after ``e`` or ends before
+    ``s``, and the two cases are disjoint, so the count is
+    ``#(start <= e) - #(end < s)`` -- two binary searches per window.
+    """
+    leave_starts = np.sort(leave_starts)
+    leave_ends = np.sort(leave_ends)
+    return (np.searchsorted(leave_starts, ends, side='right')
+            - np.searchsorted(leave_ends, starts, side='left'))
+
+
+def team_coverage_batch(requests, directory, leave_index):
+    """Team coverage for each request, in the same order as ``requests``.
+
+    Matches ``check_team_coverage`` for a single request: the share of the
+    requester's department colleagues not covered by an approved leave
+    overlapping the requested dates.  Requests are grouped by department and
+    each department's approved leaves are fetched once and counted against
+    every window in the group with vectorised binary searches.
+
+    Returns a list of ``(coverage, overlapping_count)`` tuples.
+    """
+    by_department = defaultdict(list)
+    for pos, request in enumerate(requests):
+        emp = directory.get(request.employee_id)
+        by_department[emp.department if emp else None].append(pos)
+
+    results = [None] * len(requests)
+    for department, positions in by_department.items():
+        group = [requests[pos] for pos in positions]
+        starts = _to_times([lr.start_date for lr in group])
+        ends = _to_times([lr.end_date for lr in group])
+
+        leaves = leave_index.overlapping(min(lr.start_date for lr in group),
+                                         max(lr.end_date for lr in group),
+                                         department=department)
+        counts = _overlap_counts(_to_times([lv.start_date for lv in leaves]),
+                                 _to_times([lv.end_date for lv in leaves]), starts, ends)
+
+        # Leaves taken by the requester do not count against their own coverage
+        own_leaves = defaultdict(list)
+        for leave in leaves:
+            own_leaves[leave.employee_id].append(leave)
+        for i, request in enumerate(group):
+            own = own_leaves.get(request.employee_id)
+            if own:
+                counts[i] -= _overlap_counts(_to_times([lv.start_date for lv in own]),
+                                             _to_times([lv.end_date for lv in own]),
+                                             starts[i:i + 1], ends[i:i + 1])[0]
+
+        team_size = len(directory.in_department(department)) - 1
+        for i, pos in enumerate(positions):
+            count = int(counts[i])
+            results[pos] = (1 - count / max(team_size, 1), count)
+    return results
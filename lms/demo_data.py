@@ -0,0 +1,52 @@
+"""Demo data used to seed an empty database."""
+
+from datetime import datetime
+
+from lms.accrual import run_accrual
+from lms.models import Employee, LeavePolicy, LeaveRequest
+
+
+def demo_policies():
+    return {
+        'Standard': LeavePolicy('Standard', 20, 10, 5, 5, 15, 7),
+        'Senior': LeavePolicy('Senior', 25, 12, 7, 10, 20, 5),
+        'Executive': LeavePolicy('Executive', 30, 15, 10, 15, 30, 3)
+    }
+
+def demo_employees():
+    return [
+        Employee('E001', 'John Doe', 'john@company.com', 'Engineering', 'M001', 'Standard', datetime(2020, 1, 15)),
+        Employee('E002', 'Jane Smith', 'jane@company.com', 'Marketing', 'M002', 'Senior', datetime(2018, 3, 20)),
+        Employee('E003', 'Bob Johnson', 'bob@company.com', 'Engineering', 'M001', 'Standard', datetime(2021, 6, 1)),
+        Employee('E004', 'Alice Williams', 'alice@company.com', 'HR', 'M003', 'Senior', datetime(2019, 9, 10)),
+        Employee('E005', 'Charlie Brown', 'charlie@company.com', 'Sales', 'M002', 'Standard', datetime(2022, 2, 14)),
+        Employee('M001', 'Manager One', 'manager1@company.com', 'Engineering', 'CEO', 'Executive', datetime(2015, 1, 1)),
+        Employee('M002', 'Manager Two', 'manager2@company.com', 'Marketing', 'CEO', 'Executive', datetime(2016, 1, 1)),
+        Employee('M003', 'Manager Three', 'manager3@company.com', 'HR', 'CEO', 'Executive', datetime(2017, 1, 1)),
+    ]
+
+def demo_leave_requests():
+    return [
+        LeaveRequest('L001', 'E001', 'Annual Leave', datetime(2024, 2, 1), datetime(2024, 2, 5), 5, 'Family vacation', 'Approved', datetime(2024, 1, 15), 'M001', datetime(2024, 1, 16)),
+        LeaveRequest('L002', 'E002', 'Sick Leave', datetime(2024, 1, 10), datetime(2024, 1, 12), 3, 'Flu', 'Approved', datetime(2024, 1, 9), 'M002', datetime(2024, 1, 9)),
+        LeaveRequest('L003', 'E003', 'Annual Leave', datetime(2024, 3, 15), datetime(2024, 3, 20), 4, 'Vacation', 'Pending', datetime(2024, 1, 20)),
+        LeaveRequest('L004', 'E001', 'Personal Leave', datetime(2024, 2, 26), datetime(2024, 2, 27), 2, 'Personal matters', 'Pending', datetime(2024, 1, 25)),
+        LeaveRequest('L005', 'E004', 'Annual Leave', datetime(2024, 4, 1), datetime(2024, 4, 10), 8, 'Spring break', 'Approved', datetime(2024, 1, 28), 'M003', datetime(2024, 1, 29)),
+    ]
+
+def demo_holidays():
+    return [
+        {'date': datetime(2024, 1, 1), 'name': "New Year's Day"},
+        {'date': datetime(2024, 7, 4), 'name': "Independence Day"},
+        {'date': datetime(2024, 12, 25), 'name': "Christmas Day"},
+        {'date': datetime(2024, 11, 28), 'name': "Thanksgiving"},
+    ]
+
+def seed_demo_data(store):
+    """Load the demo company into the store if it is empty"""
+    policies = demo_policies()
+    employees = demo_employees()
+    revisions = store.seed(policies, employees, demo_leave_requests(), demo_holidays())
+    if revisions is not None:
+        run_accrual(store, policies, employees, datetime.now())
+    return revisions
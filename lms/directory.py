@@ -0,0 +1,85 @@
+"""Employee directory with constant-time lookups by id, department and manager."""
+
+from collections import defaultdict
+
+
+class EmployeeDirectory:
+    """Employees indexed by id, with secondary indexes by department and manager.
+
+    Iterating the directory yields employees in insertion order, so it can be
+    used anywhere a plain list of employees was used before.  Changes to an
+    employee's department or manager must go through ``update`` (or ``add``
+    with a replacement object) to keep the secondary indexes consistent.
+    """
+
+    def __init__(self, employees=()):
+        self._by_id = {}
+        self._by_department = defaultdict(dict)
+        self._by_manager = defaultdict(dict)
+        for emp in employees:
+            self.add(emp)
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, emp_id):
+        return emp_id in self._by_id
+
+    def get(self, emp_id):
+        return self._by_id.get(emp_id)
+
+    def ids(self):
+        return list(self._by_id)
+
+    def departments(self):
+        return [dept for dept, members in self._by_department.items() if members]
+
+    def in_department(self, department, exclude=None):
+        """Employees in a department, optionally leaving one employee out"""
+        return [emp for emp_id, emp in self._by_department.get(department, {}).items()
+                if emp_id != exclude]
+
+    def reports_to(self, manager_id):
+        """Direct reports of a manager"""
+        return list(self._by_manager.get(manager_id, {}).values())
+
+    def is_manager(self, emp_id):
+        return bool(self._by_manager.get(emp_id))
+
+    def add(self, emp):
+        """Add an employee, replacing any existing record with the same id"""
+        if emp.id in self._by_id:
+            self._unindex(self._by_id[emp.id])
+        self._by_id[emp.id] = emp
+        self._by_department[emp.department][emp.id] = emp
+        self._by_manager[emp.manager_id][emp.id] = emp
+        return emp
+
+    def update(self, emp_id, **changes):
+        """Change fields on an employee and re-index it.
+
+        Indexes built on the directory are not updated: after a department
+        change, call ``LeaveIndex.reassign`` for the employee.
+        """
+        if 'id' in changes:
+            raise ValueError("Employee id cannot be changed")
+        emp = self._by_id[emp_id]
+        self._unindex(emp)
+        for field, value in changes.items():
+            setattr(emp, field, value)
+        self._by_department[emp.department][emp.id] = emp
+        self._by_manager[emp.manager_id][emp.id] = emp
+        return emp
+
+    def remove(self, emp_id):
+        emp = self._by_id.pop(emp_id, None)
+        if emp is not None:
+            self._unindex(emp)
+        return emp
+
+    def _unindex(self, emp):
+        self._by_department[emp.department].pop(emp.id, None)
+        self._by_manager[emp.manager_id].pop(emp.id, None)
@@ -0,0 +1,74 @@
+"""Streaming CSV and Parquet exports of leave requests."""
+
+import csv
+import io
+import tempfile
+
+REPORT_COLUMNS = ['Request ID', 'Employee', 'Department', 'Leave Type',
+                  'Start Date', 'End Date', 'Days', 'Status', 'Submitted']
+
+# Exports larger than this spill from memory to a temporary file
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def iter_csv(batches):
+    """Encoded CSV chunks, one per batch of rows, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REPORT_COLUMNS)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def write_csv(batches, out):
+    for chunk in iter_csv(batches):
+        out.write(chunk)
+
+
+def write_parquet(batches, out):
+    """Write batches as row groups of a Parquet file, with typed date columns"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('Request ID', pa.string()),
+        ('Employee', pa.string()),
+        ('Department', pa.dictionary(pa.int32(), pa.string())),
+        ('Leave Type', pa.dictionary(pa.int32(), pa.string())),
+        ('Start Date', pa.date32()),
+        ('End Date', pa.date32()),
+        ('Days', pa.float64()),
+        ('Status', pa.dictionary(pa.int32(), pa.string())),
+        ('Submitted', pa.date32()),
+    ])
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in batches:
+            arrays = [pa.array(values, type=field.type) if field.type == pa.float64()
+                      else pa.array(values, type=pa.string()).cast(field.type)
+                      for values, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+
+
+EXPORT_FORMATS = {
+    'CSV': (write_csv, 'text/csv', 'csv'),
+    'Parquet': (write_parquet, 'application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def export_report(batches, fmt='CSV'):
+    """Write a report to a rewound temporary file and return it.
+
+    Rows are written one batch at a time and the output moves to disk beyond
+    ``SPOOL_MAX_BYTES``, but ``st.download_button`` reads the whole file back
+    into memory to serve it, so a download still costs its full size in RAM.
+    """
+    write, _, _ = EXPORT_FORMATS[fmt]
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    write(batches, out)
+    out.seek(0)
+    return out
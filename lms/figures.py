@@ -0,0 +1,102 @@
+"""Process-wide cache of chart figures, keyed by a hash of the data they plot."""
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _feed(digest, value):
+    """Add ``value`` to ``digest`` and return its approximate size in bytes"""
+    import pandas as pd
+
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        digest.update(repr((type(value).__name__, value.shape, getattr(value, 'name', None))).encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr((list(value.columns), [str(dtype) for dtype in value.dtypes])).encode())
+        else:
+            digest.update(str(value.dtype).encode())
+        digest.update(pd.util.hash_pandas_object(value).values.tobytes())
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+        return value.nbytes
+    if isinstance(value, dict):
+        digest.update(b'{')
+        size = sum(_feed(digest, key) + _feed(digest, item) for key, item in value.items())
+        digest.update(b'}')
+        return size
+    if isinstance(value, (list, tuple)):
+        digest.update(b'(' if isinstance(value, tuple) else b'[')
+        size = sum(_feed(digest, item) for item in value)
+        digest.update(b')')
+        return size
+    digest.update(repr(value).encode())
+    digest.update(b',')
+    return sys.getsizeof(value)
+
+
+def data_hash(*data):
+    """Content hash of frames, arrays and plain values, with the approximate size of the data hashed"""
+    digest = hashlib.blake2b(digest_size=16)
+    size = _feed(digest, data)
+    return digest.hexdigest(), size
+
+
+class FigureCache:
+    """Figures reused while the data they plot is unchanged.
+
+    A figure is keyed by its name and a content hash of its input data
+    (frames, arrays, dicts of values), so any session plotting the same
+    data gets the same figure back without rebuilding it.  The least
+    recently used figures are evicted beyond ``max_entries`` or once the
+    inputs they were built from total more than ``max_bytes``.  Callers
+    must treat returned figures as read-only.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._figures = OrderedDict()
+        self._bytes = 0
+
+    def get(self, name, data, build):
+        """The figure ``build()`` makes for ``data``, built only if not cached"""
+        digest, size = data_hash(data)
+        key = (name, digest)
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                return self._figures[key][0]
+        figure = build()
+        if size > self.max_bytes:
+            return figure
+        with self._lock:
+            if key not in self._figures:
+                self._figures[key] = (figure, size)
+                self._bytes += size
+                while len(self._figures) > self.max_entries or self._bytes > self.max_bytes:
+                    _, (_, evicted) = self._figures.popitem(last=False)
+                    self._bytes -= evicted
+            return self._figures[key][0]
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._figures)
+
+
+_figure_cache = FigureCache()
+
+
+def get_figure_cache():
+    """The process-wide figure cache"""
+    return _figure_cache
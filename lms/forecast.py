@@ -0,0 +1,140 @@
+"""Weekly absence forecasts per department from leave history and bookings."""
+
+import numpy as np
+import pandas as pd
+
+# Day 0 of datetime64 (1970-01-01) is a Thursday; shifting by 3 makes weeks start on Monday
+_WEEK_SHIFT = 3
+
+
+def _week_numbers(days):
+    """Monday-based week number of each ``datetime64[D]``"""
+    return (days.astype(np.int64) + _WEEK_SHIFT) // 7
+
+
+def _week_starts(weeks):
+    return (weeks * 7 - _WEEK_SHIFT).astype('datetime64[D]')
+
+
+def _week_of_year(weeks):
+    """0-51 position within its year of each Monday-based week number"""
+    starts = _week_starts(weeks)
+    return np.minimum((starts - starts.astype('datetime64[Y]')).astype(np.int64) // 7, 51)
+
+
+def split_by_week(starts, ends, workday_calendar):
+    """Working days of each ``[start, end]`` leave falling in each Monday-based week.
+
+    Returns ``(position, week, workdays)``: one entry per leave and week it
+    touches, with ``position`` indexing the input arrays.
+    """
+    first_weeks = _week_numbers(starts)
+    spans = _week_numbers(ends) - first_weeks + 1
+    position = np.repeat(np.arange(len(starts)), spans)
+    weeks = first_weeks[position] + np.arange(len(position)) - np.repeat(np.cumsum(spans) - spans, spans)
+    segment_starts = np.maximum(starts[position], _week_starts(weeks))
+    segment_ends = np.minimum(ends[position], _week_starts(weeks) + 6)
+    return position, weeks, workday_calendar.count_many(segment_starts, segment_ends)
+
+
+def forecast_absences(history, directory, workday_calendar, start, weeks=13):
+    """Expected absent person-days per department and week for ``weeks`` weeks from ``start``.
+
+    Two signals are combined for every department and week:
+
+    * bookings -- approved leaves, plus pending ones weighted by the
+      historical approval rate, that fall in the week;
+    * a seasonal baseline -- the department's average approved absence in
+      the same week of the year over the history before ``start``.
+
+    The expectation is the larger of the two, since a baseline week with
+    few bookings yet usually fills up.  Everything is computed for all
+    departments at once on (department x week) matrices.
+
+    Returns a frame with columns ``department``, ``week`` (Monday),
+    ``headcount``, ``workdays``, ``approved``, ``pending``, ``baseline``,
+    ``expected``, ``booked_availability`` and ``projected_availability``
+    (percentages of the department's working capacity).
+    """
+    departments = sorted(directory.departments())
+    dept_code = {dept: code for code, dept in enumerate(departments)}
+    headcount = np.array([len(directory.in_department(dept)) for dept in departments])
+
+    first_week = _week_numbers(np.datetime64(start, 'D'))
+    week_numbers = first_week + np.arange(weeks)
+    week_starts = _week_starts(week_numbers)
+    horizon_start, horizon_end = week_starts[0], week_starts[-1] + 6
+    workdays = workday_calendar.count_many(week_starts, week_starts + 6)
+
+    leaves = history.frame(status=None)
+    employee_depts = [dept_code.get(getattr(directory.get(emp_id), 'department', None), -1)
+                      for emp_id in leaves['employee_id'].cat.categories]
+    depts = np.array(employee_depts, dtype=np.int64)[leaves['employee_id'].cat.codes.to_numpy()]
+    status = leaves['status'].to_numpy(dtype=object)
+    starts = leaves['start_date'].to_numpy(dtype='datetime64[D]')
+    ends = leaves['end_date'].to_numpy(dtype='datetime64[D]')
+    known = depts >= 0
+
+    # Bookings inside the horizon
+    def booked(selected):
+        selected &= known & (ends >= horizon_start) & (starts <= horizon_end)
+        position, week, days = split_by_week(np.maximum(starts[selected], horizon_start),
+                                             np.minimum(ends[selected], horizon_end), workday_calendar)
+        matrix = np.zeros((len(departments), weeks))
+        np.add.at(matrix, (depts[selected][position], week - first_week), days)
+        return matrix
+
+    approved = booked(status == 'Approved')
+    pending = booked(status == 'Pending')
+    reviewed = np.isin(status, ['Approved', 'Rejected'])
+    approval_rate = (status == 'Approved').sum() / reviewed.sum() if reviewed.any() else 1.0
+
+    # Seasonal baseline from approved history before the horizon
+    past = known & (status == 'Approved') & (starts < horizon_start)
+    position, week, days = split_by_week(starts[past], np.minimum(ends[past], horizon_start - 1),
+                                         workday_calendar)
+    seasonal = np.zeros((len(departments), 52))
+    np.add.at(seasonal, (depts[past][position], _week_of_year(week)), days)
+    # How many times each week of the year occurs in the history, to average over
+    observed_weeks = np.arange(week.min() if len(week) else first_week, first_week)
+    occurrences = np.bincount(_week_of_year(observed_weeks), minlength=52)
+    horizon_weeks_of_year = _week_of_year(week_numbers)
+    baseline = seasonal[:, horizon_weeks_of_year] / np.maximum(occurrences[horizon_weeks_of_year], 1)
+
+    expected = np.maximum(baseline, approved + approval_rate * pending)
+    capacity = np.outer(headcount, workdays).astype(np.float64)
+
+    def availability(absent):
+        return np.divide(capacity - np.minimum(absent, capacity), capacity,
+                         out=np.ones_like(capacity), where=capacity > 0) * 100
+
+    return pd.DataFrame({
+        'department': np.repeat(departments, weeks),
+        'week': np.tile(week_starts.astype('datetime64[s]'), len(departments)),
+        'headcount': np.repeat(headcount, weeks),
+        'workdays': np.tile(workdays, len(departments)),
+        'approved': approved.ravel(),
+        'pending': pending.ravel(),
+        'baseline': baseline.ravel(),
+        'expected': expected.ravel(),
+        'booked_availability': availability(approved).ravel(),
+        'projected_availability': availability(expected).ravel(),
+    })
+
+
+def availability_by_week(forecast, departments=None):
+    """Booked and projected availability (%) per week, pooled over ``departments`` (default: all)"""
+    if departments is not None:
+        forecast = forecast[forecast['department'].isin(departments)]
+    capacity = forecast['headcount'] * forecast['workdays']
+    pooled = pd.DataFrame({
+        'week': forecast['week'],
+        'capacity': capacity,
+        'approved': np.minimum(forecast['approved'], capacity),
+        'expected': np.minimum(forecast['expected'], capacity),
+    }).groupby('week').sum()
+    capacity = pooled['capacity'].where(pooled['capacity'] > 0)
+    return pd.DataFrame({
+        'Booked': (1 - pooled['approved'] / capacity).fillna(1) * 100,
+        'Projected': (1 - pooled['expected'] / capacity).fillna(1) * 100,
+    })
@@ -0,0 +1,212 @@
+"""Columnar, in-memory leave history for vectorised analytics."""
+
+from datetime import date
+
+import numpy as np
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+class _Codes:
+    """Small integer codes for a growing set of labels (employees, types, statuses)"""
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self._code = {}
+        for label in labels:
+            self.code(label)
+
+    def code(self, label):
+        code = self._code.get(label)
+        if code is None:
+            code = self._code[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def get(self, label):
+        """Code of ``label``, or -1 (matching nothing) if it has none"""
+        return self._code.get(label, -1)
+
+    def codes_for(self, labels):
+        """Codes of the labels that have one; unknown labels are skipped"""
+        return np.array([self._code[label] for label in labels if label in self._code], dtype=np.int32)
+
+
+def _days_since_epoch(dates):
+    """``datetime64[D]`` array of ``dates``, built from ordinals rather than one object at a time"""
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64)
+    return (ordinals - _EPOCH).astype('datetime64[D]')
+
+
+class LeaveHistory:
+    """Leave requests held as parallel NumPy columns instead of objects.
+
+    Dates are ``datetime64[D]``, days ``float32`` and employee, leave type
+    and status small integer codes, so analytics filter and group whole
+    columns instead of walking objects.  This is a copy alongside the
+    service's ``LeaveRequest`` objects, not a replacement for them: rows are
+    keyed by ``id(request)``, so the caller must keep each added request
+    alive until it is removed.  Each employee's row numbers are kept too,
+    so queries for a few employees read only their rows.  The initial
+    ``requests`` fill whole columns at once; later changes follow the same
+    ``add`` / ``reindex`` / ``remove`` protocol as ``LeaveIndex``.  Removal
+    moves the last row into the freed slot, so row order carries no meaning.
+    """
+
+    def __init__(self, requests=(), capacity=1024):
+        self._employees = _Codes()
+        self._types = _Codes(['Annual Leave', 'Sick Leave', 'Personal Leave'])
+        self._statuses = _Codes(['Pending', 'Approved', 'Rejected'])
+        requests = list(requests)
+        self._size = 0
+        self._rows = {}
+        self._employee_rows = {}
+        self._allocate(max(capacity, len(requests)))
+        self._fill(requests)
+
+    def __len__(self):
+        return self._size
+
+    def _allocate(self, capacity):
+        columns = {
+            'keys': np.empty(capacity, dtype=np.int64),
+            'ids': np.empty(capacity, dtype=object),
+            'employee': np.empty(capacity, dtype=np.int32),
+            'leave_type': np.empty(capacity, dtype=np.int8),
+            'status': np.empty(capacity, dtype=np.int8),
+            'start': np.empty(capacity, dtype='datetime64[D]'),
+            'end': np.empty(capacity, dtype='datetime64[D]'),
+            'submitted': np.empty(capacity, dtype='datetime64[D]'),
+            'days': np.empty(capacity, dtype=np.float32),
+        }
+        for name, column in columns.items():
+            old = getattr(self, '_' + name, None)
+            if old is not None:
+                column[:self._size] = old[:self._size]
+            setattr(self, '_' + name, column)
+
+    def _fill(self, requests):
+        """Load ``requests`` into an empty history, one array per column"""
+        n = self._size = len(requests)
+        self._keys[:n] = np.fromiter(map(id, requests), dtype=np.int64, count=n)
+        self._ids[:n] = [lr.id for lr in requests]
+        employees = [self._employees.code(lr.employee_id) for lr in requests]
+        self._employee[:n] = employees
+        self._leave_type[:n] = [self._types.code(lr.leave_type) for lr in requests]
+        self._status[:n] = [self._statuses.code(lr.status) for lr in requests]
+        self._start[:n] = _days_since_epoch(lr.start_date for lr in requests)
+        self._end[:n] = _days_since_epoch(lr.end_date for lr in requests)
+        self._submitted[:n] = _days_since_epoch(lr.submitted_date for lr in requests)
+        self._days[:n] = np.fromiter((lr.days for lr in requests), dtype=np.float32, count=n)
+        self._rows = dict(zip(self._keys[:n].tolist(), range(n)))
+        for row, employee in enumerate(employees):
+            self._employee_rows.setdefault(employee, set()).add(row)
+
+    def add(self, request):
+        if id(request) in self._rows:
+            self.remove(request)
+        if self._size == len(self._days):
+            self._allocate(2 * len(self._days))
+        row = self._size
+        self._keys[row] = id(request)
+        self._ids[row] = request.id
+        self._employee[row] = employee = self._employees.code(request.employee_id)
+        self._employee_rows.setdefault(employee, set()).add(row)
+        self._leave_type[row] = self._types.code(request.leave_type)
+        self._status[row] = self._statuses.code(request.status)
+        self._start[row] = np.datetime64(request.start_date.date(), 'D')
+        self._end[row] = np.datetime64(request.end_date.date(), 'D')
+        self._submitted[row] = np.datetime64(request.submitted_date.date(), 'D')
+        self._days[row] = request.days
+        self._rows[id(request)] = row
+        self._size += 1
+
+    def remove(self, request):
+        row = self._rows.pop(id(request), None)
+        if row is None:
+            return
+        last = self._size - 1
+        self._employee_rows[int(self._employee[row])].discard(row)
+        if row != last:
+            moved = self._employee_rows[int(self._employee[last])]
+            moved.discard(last)
+            moved.add(row)
+            for column in (self._keys, self._ids, self._employee, self._leave_type, self._status,
+                           self._start, self._end, self._submitted, self._days):
+                column[row] = column[last]
+            self._rows[int(self._keys[row])] = row
+        self._ids[last] = None
+        self._size = last
+
+    def reindex(self, request):
+        self.remove(request)
+        self.add(request)
+
+    def employee_ids(self):
+        """Every employee that has had a request in the history"""
+        return list(self._employees.labels)
+
+    def _select(self, employee_ids, status, leave_type):
+        """Row numbers (or a boolean mask over every row) of the matching requests"""
+        if employee_ids is None:
+            selection = np.ones(self._size, dtype=bool)
+        else:
+            codes = self._employees.codes_for(employee_ids)
+            buckets = [self._employee_rows[code] for code in dict.fromkeys(codes.tolist())]
+            count = sum(len(rows) for rows in buckets)
+            if count * 8 < self._size:
+                # A few employees: gather their rows rather than test every row
+                selection = np.fromiter((row for rows in buckets for row in rows), dtype=np.intp, count=count)
+                selection.sort()
+            else:
+                selection = np.isin(self._employee[:self._size], codes)
+        if status is not None:
+            selection = self._narrow(selection, self._status, self._statuses.get(status))
+        if leave_type is not None:
+            selection = self._narrow(selection, self._leave_type, self._types.get(leave_type))
+        return selection
+
+    def _narrow(self, selection, column, code):
+        if selection.dtype == bool:
+            return selection & (column[:self._size] == code)
+        return selection[column[selection] == code]
+
+    def columns(self, employee_ids=None, status='Approved', leave_type=None):
+        """Matching requests as NumPy arrays, for callers that do not need a DataFrame.
+
+        Keys: ``employee_id`` (object), ``start_date`` and ``end_date``
+        (``datetime64[D]``) and ``days`` (``float64``).
+        """
+        selection = self._select(employee_ids, status, leave_type)
+        return {
+            'employee_id': np.array(self._employees.labels, dtype=object)[self._employee[:self._size][selection]],
+            'start_date': self._start[:self._size][selection],
+            'end_date': self._end[:self._size][selection],
+            'days': self._days[:self._size][selection].astype(np.float64),
+        }
+
+    def frame(self, employee_ids=None, status='Approved', leave_type=None):
+        """Matching requests as a DataFrame with categorical and datetime64 columns.
+
+        Columns: ``id``, ``employee_id``, ``leave_type``, ``status``,
+        ``start_date``, ``end_date``, ``submitted_date`` and ``days``.  Pass ``status=None`` for
+        every status.
+        """
+        # pandas is only needed here, so services that never ask for a frame start without it
+        import pandas as pd
+
+        selection = self._select(employee_ids, status, leave_type)
+
+        def categorical(codes, labels):
+            return pd.Categorical.from_codes(codes[:self._size][selection], categories=labels.labels)
+
+        return pd.DataFrame({
+            'id': self._ids[:self._size][selection],
+            'employee_id': categorical(self._employee, self._employees),
+            'leave_type': categorical(self._leave_type, self._types),
+            'status': categorical(self._status, self._statuses),
+            'start_date': self._start[:self._size][selection].astype('datetime64[s]'),
+            'end_date': self._end[:self._size][selection].astype('datetime64[s]'),
+            'submitted_date': self._submitted[:self._size][selection].astype('datetime64[s]'),
+            'days': self._days[:self._size][selection].astype(np.float64),
+        })
@@ -0,0 +1,176 @@
+"""Date-range index over leave requests."""
+
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+
+class _Bucket:
+    """Requests sorted by start date, plus the longest span among them.
+
+    Any request overlapping ``[start, end]`` must begin no earlier than
+    ``start - max_span``, so an overlap query only has to walk the starts in
+    ``[start - max_span, end]``.  Leaves are bounded by policy
+    (``max_consecutive_days``), which keeps that window small.  Spans are
+    counted, so ``max_span`` shrinks again once its longest leave is removed.
+    """
+
+    __slots__ = ('starts', 'requests', 'spans', 'max_span')
+
+    def __init__(self, requests=()):
+        self.requests = sorted(requests, key=lambda lr: lr.start_date)
+        self.starts = [lr.start_date for lr in self.requests]
+        self.spans = Counter(lr.end_date - lr.start_date for lr in self.requests)
+        self.max_span = max(self.spans, default=timedelta(0))
+
+    def add(self, request):
+        pos = bisect_right(self.starts, request.start_date)
+        self.starts.insert(pos, request.start_date)
+        self.requests.insert(pos, request)
+        span = request.end_date - request.start_date
+        self.spans[span] += 1
+        if span > self.max_span:
+            self.max_span = span
+
+    def remove(self, request, start_date, span):
+        # Requests starting the same day are few; find this one among them by identity
+        for pos in range(bisect_left(self.starts, start_date), bisect_right(self.starts, start_date)):
+            if self.requests[pos] is request:
+                del self.starts[pos]
+                del self.requests[pos]
+                self.spans[span] -= 1
+                if not self.spans[span]:
+                    del self.spans[span]
+                    if span == self.max_span:
+                        self.max_span = max(self.spans, default=timedelta(0))
+                return
+
+    def _window(self, start, end):
+        return bisect_left(self.starts, start - self.max_span), bisect_right(self.starts, end)
+
+    def overlapping(self, start, end):
+        lo, hi = self._window(start, end)
+        return [lr for lr in self.requests[lo:hi] if lr.end_date >= start]
+
+    def walked(self, start, end):
+        """Requests an overlap query for ``[start, end]`` looks at"""
+        lo, hi = self._window(start, end)
+        return max(hi - lo, 0)
+
+    def starting_between(self, start, end=None):
+        lo = bisect_left(self.starts, start)
+        hi = len(self.starts) if end is None else bisect_right(self.starts, end)
+        return self.requests[lo:hi]
+
+
+def _keys(status, employee_id, department):
+    return [(status, 'employee', employee_id), (status, 'department', department), (status, 'all', None)]
+
+
+class LeaveIndex:
+    """Leave requests indexed by status and by employee, department or company.
+
+    Overlap queries run in O(log n + k) per bucket.  The index must be told
+    about every change: ``add`` for new requests, ``reindex`` after a status
+    change (approve/reject), ``remove`` for cancellations and ``reassign``
+    after an employee moves department.  The initial ``requests`` are
+    grouped and each bucket sorted once, rather than inserted one by one.
+    """
+
+    def __init__(self, directory, requests=()):
+        self._directory = directory
+        self._entries = {}
+        self._departments = {}
+        self._statuses = set()
+        grouped = defaultdict(list)
+        for request in requests:
+            for key in self._file(request):
+                grouped[key].append(request)
+        self._buckets = {key: _Bucket(members) for key, members in grouped.items()}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _file(self, request):
+        """Record where ``request`` is filed and return its bucket keys"""
+        emp = self._directory.get(request.employee_id)
+        department = emp.department if emp else None
+        self._departments[request.employee_id] = department
+        self._statuses.add(request.status)
+        # What removal needs, kept as it was when filed in case the request changes later
+        self._entries[id(request)] = (request.status, request.employee_id, department,
+                                      request.start_date, request.end_date)
+        return _keys(request.status, request.employee_id, department)
+
+    def _bucket(self, status, employee_id=None, department=None):
+        if employee_id is not None:
+            scope = ('employee', employee_id)
+        elif department is not None:
+            scope = ('department', department)
+        else:
+            scope = ('all', None)
+        return self._buckets.get((status,) + scope)
+
+    def add(self, request):
+        if id(request) in self._entries:
+            self.remove(request)
+        for key in self._file(request):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket()
+            bucket.add(request)
+
+    def remove(self, request):
+        entry = self._entries.pop(id(request), None)
+        if entry is None:
+            return
+        status, employee_id, department, start_date, end_date = entry
+        for key in _keys(status, employee_id, department):
+            self._buckets[key].remove(request, start_date, end_date - start_date)
+
+    def reindex(self, request):
+        """Move a request to the buckets matching its current status and dates"""
+        self.remove(request)
+        self.add(request)
+
+    def reassign(self, employee_id):
+        """Re-file an employee's requests under their current department.
+
+        Call after the employee's department changed in the directory
+        (``EmployeeDirectory.update``); the index cannot see that by itself.
+        """
+        requests = []
+        for status in self._statuses:
+            bucket = self._buckets.get((status, 'employee', employee_id))
+            if bucket is not None:
+                requests += bucket.requests
+        for request in requests:
+            self.reindex(request)
+
+    def rebind(self, directory):
+        """Look employees up in ``directory`` from now on, re-filing anyone whose department differs there"""
+        self._directory = directory
+        for employee_id, department in list(self._departments.items()):
+            emp = directory.get(employee_id)
+            if (emp.department if emp else None) != department:
+                self.reassign(employee_id)
+
+    def overlapping(self, start, end, status='Approved', employee_id=None, department=None):
+        """Requests with the given status whose dates intersect ``[start, end]``"""
+        bucket = self._bucket(status, employee_id, department)
+        return bucket.overlapping(start, end) if bucket else []
+
+    def size(self, status='Approved', employee_id=None, department=None):
+        """Requests with the given status in the scope"""
+        bucket = self._bucket(status, employee_id, department)
+        return len(bucket.starts) if bucket else 0
+
+    def overlap_walk(self, start, end, status='Approved', employee_id=None, department=None):
+        """Requests an ``overlapping`` query with the same arguments looks at, matching or not"""
+        bucket = self._bucket(status, employee_id, department)
+        return bucket.walked(start, end) if bucket else 0
+
+    def starting_between(self, start, end=None, status='Approved', employee_id=None, department=None):
+        """Requests with the given status starting in ``[start, end]``, ordered by start date"""
+        bucket = self._bucket(status, employee_id, department)
+        return bucket.starting_between(start, end) if bucket else []
@@ -0,0 +1,42 @@
+"""Append-only leave balance ledger entries."""
+
+from dataclasses import dataclass
+from datetime import datetime
+
+KINDS = ('grant', 'accrue', 'deduct', 'restore', 'carryover', 'expire')
+
+LEAVE_BUCKETS = {
+    'Annual Leave': 'Used Annual',
+    'Sick Leave': 'Used Sick',
+    'Personal Leave': 'Used Personal',
+}
+
+
+@dataclass
+class LedgerEntry:
+    """A signed change to one balance bucket; balances are the sum of their entries"""
+    employee_id: str
+    bucket: str
+    kind: str
+    days: float
+    request_id: str = None
+    effective_date: datetime = None
+
+    def __post_init__(self):
+        if self.kind not in KINDS:
+            raise ValueError(f"Unknown ledger entry kind: {self.kind}")
+
+
+def usage_entries(employee_id, leave_type, days, kind='deduct', request_id=None, effective_date=None):
+    """Entries moving days out of (``deduct``) or back into (``restore``) a leave type's bucket.
+
+    ``effective_date`` should be the leave's start date, so year-end can
+    tell this year's usage from next year's.
+    """
+    sign = -1 if kind == 'deduct' else 1
+    used_bucket = LEAVE_BUCKETS.get(leave_type, f"Used {leave_type.split()[0]}")
+    return [
+        LedgerEntry(employee_id, leave_type, kind, sign * days, request_id, effective_date),
+        LedgerEntry(employee_id, used_bucket, kind, -sign * days, request_id, effective_date),
+    ]
+
@@ -0,0 +1,163 @@
+"""Opt-in, process-wide timing of hot paths: call counts, latency and records scanned.
+
+Instrumentation is off unless ``LMS_METRICS=1`` is set or an admin turns it
+on from Settings; while off, an instrumented call costs one attribute check.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+SAMPLES = 1024
+
+
+class _Series:
+    """Running totals for one instrumented name, with the latest durations for percentiles"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.records = 0
+        self.recent = deque(maxlen=SAMPLES)
+
+    def record(self, seconds, records, failed):
+        self.calls += 1
+        self.errors += failed
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.records += records or 0
+        self.recent.append(seconds)
+
+    def percentile(self, q):
+        ordered = sorted(self.recent)
+        if not ordered:
+            return 0.0
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Metrics:
+    """Timings of instrumented functions and blocks, keyed by name.
+
+    ``instrument`` wraps a function and ``timer`` a block; both record only
+    while ``enabled``.  ``records`` is the number of rows or requests the
+    call went through, where that is the cost driver.  Only exceptions
+    count as errors, so a Streamlit rerun or stop raised through a page is
+    an ordinary call.  Percentiles are over the last ``SAMPLES`` calls of
+    each name.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._series = {}
+        self.since = time.time()
+
+    def record(self, name, seconds, records=None, failed=False):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _Series()
+            series.record(seconds, records, failed)
+
+    @contextmanager
+    def timer(self, name, records=None):
+        """Time the block under ``name``; ``records`` may also be set later via the yielded dict"""
+        if not self.enabled:
+            yield {}
+            return
+        scanned = {'records': records}
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield scanned
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, scanned['records'], failed)
+
+    def instrument(self, name, records=None):
+        """Decorator timing every call under ``name``.
+
+        ``records(result, *args, **kwargs)`` counts the records the call
+        scanned; it sees the decorated function's own arguments.
+        """
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                started = time.perf_counter()
+                scanned, failed = None, False
+                try:
+                    result = function(*args, **kwargs)
+                    if records:
+                        scanned = records(result, *args, **kwargs)
+                    return result
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    self.record(name, time.perf_counter() - started, scanned, failed)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.since = time.time()
+
+    def snapshot(self):
+        """One dict per name with calls, errors, total/mean/p50/p95/max milliseconds and records, slowest first"""
+        with self._lock:
+            rows = [{
+                'name': name,
+                'calls': series.calls,
+                'errors': series.errors,
+                'total_ms': series.total * 1000,
+                'mean_ms': series.total / series.calls * 1000,
+                'p50_ms': series.percentile(0.5) * 1000,
+                'p95_ms': series.percentile(0.95) * 1000,
+                'max_ms': series.max * 1000,
+                'records': series.records,
+            } for name, series in self._series.items()]
+        rows.sort(key=lambda row: -row['total_ms'])
+        return rows
+
+    def to_json(self):
+        return json.dumps({'since': self.since, 'enabled': self.enabled, 'metrics': self.snapshot()}, indent=2)
+
+    def to_prometheus(self):
+        """The snapshot in the Prometheus text exposition format"""
+        lines = [
+            '# HELP lms_seconds Time in instrumented calls, with quantiles over recent calls.',
+            '# TYPE lms_seconds summary',
+        ]
+        rows = self.snapshot()
+        for row in rows:
+            label = f'name="{row["name"]}"'
+            lines += [
+                f'lms_seconds{{{label},quantile="0.5"}} {row["p50_ms"] / 1000:.6f}',
+                f'lms_seconds{{{label},quantile="0.95"}} {row["p95_ms"] / 1000:.6f}',
+                f'lms_seconds_sum{{{label}}} {row["total_ms"] / 1000:.6f}',
+                f'lms_seconds_count{{{label}}} {row["calls"]}',
+            ]
+        for metric, field, help_text in (('lms_errors_total', 'errors', 'Instrumented calls that raised.'),
+                                         ('lms_records_total', 'records', 'Records scanned by instrumented calls.')):
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+            lines += [f'{metric}{{name="{row["name"]}"}} {row[field]}' for row in rows]
+        return '\n'.join(lines) + '\n'
+
+
+_metrics = Metrics(enabled=os.environ.get('LMS_METRICS', '') not in ('', '0'))
+
+
+def get_metrics():
+    """The process-wide metrics registry"""
+    return _metrics
@@ -0,0 +1,41 @@
+"""Domain data classes shared by the UI, storage and engines."""
+
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass
+class LeavePolicy:
+    name: str
+    annual_days: int
+    sick_days: int
+    personal_days: int
+    carryover_limit: int
+    max_consecutive_days: int
+    min_notice_days: int
+
+@dataclass
+class Employee:
+    id: str
+    name: str
+    email: str
+    department: str
+    manager_id: str
+    policy: str
+    hire_date: datetime
+
+# Slots: the service keeps every request resident, so drop the per-instance __dict__
+@dataclass(slots=True)
+class LeaveRequest:
+    id: str
+    employee_id: str
+    leave_type: str
+    start_date: datetime
+    end_date: datetime
+    days: float
+    reason: str
+    status: str
+    submitted_date: datetime
+    approver_id: str = None
+    approved_date: datetime = None
+    comments: str = ""
@@ -0,0 +1,102 @@
+"""Data each page of the app shows, prepared without Streamlit.
+
+The app renders what these return and the benchmarks time them, so both
+run the same code.  Modules that pull in pandas are imported inside the
+functions that need them, keeping them off the app's startup path.
+"""
+
+from lms.export import export_report
+
+CALENDAR_VIEWS = ("My Team", "Department", "All Employees")
+
+
+def dashboard(service, employee, now, limit=5):
+    """Metrics and the next few leaves of the employee and their department for the dashboard"""
+    balance = service.balance(employee.id)
+    team_absences = [lr for lr in service.leaves_starting(now, department=employee.department)
+                     if lr.employee_id != employee.id]
+    return {
+        'balance': balance,
+        'total_balance': sum(balance.get(bucket, 0) for bucket in ('Annual Leave', 'Sick Leave', 'Personal Leave')),
+        'used_total': sum(service.used_days(employee.id, year=now.year).values()),
+        'pending_count': service.pending_count(employee.id),
+        'pending_approvals': service.pending_approval_count(employee.id),
+        'upcoming': service.leaves_starting(now, employee_id=employee.id)[:limit],
+        'team_absences': team_absences[:limit],
+    }
+
+
+def availability_outlook(service, departments, now):
+    """Booked vs projected weekly availability for the next quarter (see ``availability_by_week``)"""
+    from lms.forecast import availability_by_week
+
+    return availability_by_week(service.absence_forecast(now), departments)
+
+
+def request_summary(store, employee_id, statuses, leave_types, year):
+    """Counts and approved days of the employee's requests matching the filters"""
+    return store.request_summary(employee_id, statuses, leave_types, year)
+
+
+def request_page(store, employee_id, statuses, leave_types, year, page, page_size):
+    """One page (numbered from 1) of the employee's requests matching the filters, newest first"""
+    return store.page_requests(employee_id, statuses, leave_types, year,
+                               limit=page_size, offset=(page - 1) * page_size)
+
+
+def approval_queue(service, approver_id):
+    """Pending requests for ``approver_id`` with their coverage, validation and sick-leave patterns"""
+    pending = service.pending_approvals(approver_id)
+    coverage = service.team_coverage_batch(pending)
+    validation = service.validate_requests(pending, coverage)
+    sick_patterns = service.sick_leave_patterns({lr.employee_id for lr in pending if lr.leave_type == 'Sick Leave'})
+    return pending, coverage, validation, sick_patterns
+
+
+def calendar_employees(directory, view, employee):
+    """Employees shown by a Team Calendar view (one of ``CALENDAR_VIEWS``)"""
+    if view == "My Team":
+        return directory.reports_to(employee.id)
+    if view == "Department":
+        return directory.in_department(employee.department)
+    return list(directory)
+
+
+def calendar_window(service, cache, view, employee, employees, year, month, months):
+    """(approved leaves, daily availability frame) for a Team Calendar view, through a ``MonthlyAvailabilityCache``"""
+    def fetch_leaves(period_start, period_end):
+        if view == "My Team":
+            return [lr for e in employees
+                    for lr in service.leaves_overlapping(period_start, period_end, employee_id=e.id)]
+        elif view == "Department":
+            return service.leaves_overlapping(period_start, period_end, department=employee.department)
+        return service.leaves_overlapping(period_start, period_end)
+
+    return cache.window((service.revision, service.reference_version), (view, employee.id),
+                        [e.id for e in employees], year, month, months, fetch_leaves)
+
+
+def usage_trends(service, employee_ids=None, by_department=False):
+    """(approved leaves, monthly usage by type, monthly usage by department or None) for the analytics page.
+
+    ``employee_ids=None`` covers the whole company.  Leaves spanning months
+    are split across them by working day.
+    """
+    from lms.trends import monthly_usage
+
+    reference = service.reference
+    leaves = service.leave_frame(employee_ids)
+    if not len(leaves):
+        return leaves, None, None
+    monthly = monthly_usage(leaves, reference.workday_calendar)
+    departments = None
+    if by_department:
+        labels = leaves['employee_id'].map(
+            lambda emp_id: getattr(reference.employees.get(emp_id), 'department', "Unknown"))
+        departments = monthly_usage(leaves, reference.workday_calendar, by=labels)
+    return leaves, monthly, departments
+
+
+def report_file(store, fmt='CSV', **scope):
+    """A report of the requests in ``scope`` (see ``LeaveStore.iter_report_rows``) as a rewound file"""
+    return export_report(store.iter_report_rows(**scope), fmt)
@@ -0,0 +1,82 @@
+"""Process-wide cache of read-mostly reference data."""
+
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from lms.directory import EmployeeDirectory
+from lms.workdays import WorkdayCalendar
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """Immutable snapshot of policies, employees and holidays.
+
+    Every session in the process shares the same snapshot, so callers must
+    treat the contained objects as read-only and change reference data only
+    through the store, followed by ``ReferenceCache.invalidate``.
+    """
+
+    version: int
+    policies: MappingProxyType
+    employees: EmployeeDirectory
+    holidays: tuple
+    workday_calendar: WorkdayCalendar
+
+
+class ReferenceCache:
+    """Loads a ``ReferenceData`` snapshot once and shares it until invalidated.
+
+    The snapshot is tagged with the store's reference version, which every
+    holiday or policy edit bumps in the same transaction.  ``refresh_if_stale``
+    compares the two so edits made by other processes are picked up too.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                snapshot = self._snapshot
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def refresh_if_stale(self):
+        """Drop the snapshot if the store's reference data has moved on"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version != self._store.reference_version():
+            self.invalidate()
+        return self.get()
+
+    def _load(self):
+        version = self._store.reference_version()
+        holidays = tuple(MappingProxyType(h) for h in self._store.load_holidays())
+        return ReferenceData(
+            version=version,
+            policies=MappingProxyType(self._store.load_policies()),
+            employees=EmployeeDirectory(self._store.load_employees()),
+            holidays=holidays,
+            workday_calendar=WorkdayCalendar(h['date'] for h in holidays),
+        )
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_reference_cache(store):
+    """Process-wide reference cache for ``store``"""
+    with _caches_lock:
+        cache = _caches.get(store.path)
+        if cache is None:
+            cache = _caches[store.path] = ReferenceCache(store)
+        return cache
@@ -0,0 +1,422 @@
+"""Leave domain operations independent of any UI session, shared by the app and the HTTP API."""
+
+import threading
+from dataclasses import replace
+from datetime import datetime
+
+from lms.aggregates import LeaveAggregates
+from lms.coverage import team_coverage_batch
+from lms.history import LeaveHistory
+from lms.intervals import LeaveIndex
+from lms.ledger import usage_entries
+from lms.metrics import get_metrics
+from lms.models import LeaveRequest
+from lms.reference import get_reference_cache
+from lms.wellness import WellnessAnalyzer
+
+metrics = get_metrics()
+
+# Catching up on more balance changes than this reloads every balance in one query
+BALANCE_RELOAD_THRESHOLD = 1000
+
+
+# Records scanned by instrumented methods, from their result and arguments
+def _requests_held(result, service, *args, **kwargs):
+    return len(service.requests)
+
+
+def _changes_applied(result, *args, **kwargs):
+    return result or 0
+
+
+def _requests_given(result, service, requests, *args, **kwargs):
+    return len(requests)
+
+
+def _department_walked(result, service, employee_id, start_date, end_date):
+    with service._lock:
+        department = service.employee(employee_id).department
+        return service.index.overlap_walk(start_date, end_date, department=department)
+
+
+def _reports_walked(*statuses):
+    def walked(result, service, approver_id, *args, **kwargs):
+        with service._lock:
+            return sum(service.index.size(status, employee_id=emp.id)
+                       for emp in service.reference.employees.reports_to(approver_id) for status in statuses)
+    return walked
+
+
+class LeaveService:
+    """Validation, coverage and the request lifecycle over a ``LeaveStore``.
+
+    Keeps one in-memory copy of the leave requests (by id), their
+    ``LeaveIndex``, ``LeaveAggregates``, ``LeaveHistory`` and
+    ``WellnessAnalyzer`` and the balances, meant to be shared by every
+    session in the process (see ``get_service``).  ``refresh`` catches the
+    copy up with the store: it asks the store which requests and balances
+    changed since the last refresh and reloads just those, whether the
+    writes came from this service, another session or another process.
+    Request objects are replaced rather than changed, so lists handed out
+    stay consistent.  A lock serialises every operation, so the service can
+    be shared between threads.
+    """
+
+    def __init__(self, store, reference_cache=None):
+        self.store = store
+        self.reference_cache = reference_cache or get_reference_cache(store)
+        self._lock = threading.RLock()
+        self.revision = None
+        self.reference_version = None
+        self._position = None
+        self.requests = {}
+        self.wellness = None
+        self._forecast = None
+        self.refresh()
+
+    def refresh(self):
+        """Catch the in-memory copy up with the store if it changed since the last refresh"""
+        with self._lock:
+            reference = self.reference_cache.refresh_if_stale()
+            revision = self.store.revision
+            if revision == self.revision and reference.version == self.reference_version:
+                return
+            if self._position is None or self._catch_up(revision, reference) is None:
+                self._reload(revision, reference)
+
+    @metrics.instrument('service.reload', records=_requests_held)
+    def _reload(self, revision, reference):
+        """Load everything as of ``revision``; the caller holds the lock"""
+        self.revision = revision
+        self.reference_version = reference.version
+        self._position = self.store.change_position()
+        previous = self.requests
+        self.requests = {lr.id: lr for lr in self.store.load_leave_requests()}
+        self.index = LeaveIndex(reference.employees, self.requests.values())
+        self.aggregates = LeaveAggregates(reference.employees, self.requests.values())
+        self.history = LeaveHistory(self.requests.values())
+        if self.wellness is None:
+            self.wellness = WellnessAnalyzer(self.history)
+        else:
+            self.wellness.rebind(self.history, previous, self.requests)
+        self.balances = self.store.load_balances()
+
+    @metrics.instrument('service.catch_up', records=_changes_applied)
+    def _catch_up(self, revision, reference):
+        """Apply the changes made since the last refresh and return how many; None if a reload is needed"""
+        position, request_ids, employee_ids = self.store.changes_since(self._position)
+        if request_ids is None:
+            return None
+        if reference.version != self.reference_version:
+            self.index.rebind(reference.employees)
+            self.aggregates.rebind(reference.employees)
+        views = (self.index, self.aggregates, self.history, self.wellness)
+        stored = {lr.id: lr for lr in self.store.load_requests(request_ids)}
+        for request_id in request_ids:
+            old = self.requests.pop(request_id, None)
+            if old is not None:
+                for view in views:
+                    view.remove(old)
+            new = stored.get(request_id)
+            if new is not None:
+                self.requests[request_id] = new
+                for view in views:
+                    view.add(new)
+        if len(employee_ids) > BALANCE_RELOAD_THRESHOLD:
+            self.balances = self.store.load_balances()
+        elif employee_ids:
+            self.balances.update(self.store.load_balances(employee_ids))
+        self.revision = revision
+        self.reference_version = reference.version
+        self._position = position
+        return len(request_ids) + len(employee_ids)
+
+    def invalidate(self):
+        """Make the next ``refresh`` reload everything from the store"""
+        with self._lock:
+            self.revision = None
+            self._position = None
+
+    def clear_caches(self):
+        """Forget the cached forecast and sick-leave patterns, so the next calls recompute them"""
+        with self._lock:
+            self._forecast = None
+            self.wellness = WellnessAnalyzer(self.history)
+
+    def _write(self, write, *args):
+        """Write through to the store, then catch up with it, including when the write was refused"""
+        try:
+            return write(*args)
+        finally:
+            self.refresh()
+
+    @property
+    def reference(self):
+        """Shared, read-only snapshot of policies, employees and holidays"""
+        return self.reference_cache.get()
+
+    def employee(self, emp_id):
+        return self.reference.employees.get(emp_id)
+
+    def request(self, request_id):
+        """The service's copy of a request, or None"""
+        with self._lock:
+            return self.requests.get(request_id)
+
+    def balance(self, employee_id):
+        """An employee's balances by bucket"""
+        with self._lock:
+            return self.balances.get(employee_id, {})
+
+    def pending_count(self, employee_id):
+        with self._lock:
+            return self.aggregates.pending_count(employee_id)
+
+    def pending_approval_count(self, manager_id):
+        with self._lock:
+            return self.aggregates.pending_approvals(manager_id)
+
+    def used_days(self, employee_id, year=None):
+        """Approved days by leave type, for leaves starting in ``year`` if given"""
+        with self._lock:
+            return self.aggregates.used_days(employee_id, year=year)
+
+    def next_upcoming(self, employee_id, now):
+        """The employee's first approved leave starting on or after ``now``"""
+        with self._lock:
+            upcoming = self.index.starting_between(now, employee_id=employee_id)
+            return upcoming[0] if upcoming else None
+
+    def leaves_starting(self, start, end=None, status='Approved', employee_id=None, department=None):
+        """Leaves with the given status starting in ``[start, end]``, by start date (see ``LeaveIndex``)"""
+        with self._lock:
+            return self.index.starting_between(start, end, status, employee_id, department)
+
+    def leaves_overlapping(self, start, end, status='Approved', employee_id=None, department=None):
+        """Leaves with the given status intersecting ``[start, end]`` (see ``LeaveIndex``)"""
+        with self._lock:
+            return self.index.overlapping(start, end, status, employee_id, department)
+
+    def leave_frame(self, employee_ids=None, status='Approved', leave_type=None):
+        """Matching requests as a DataFrame (see ``LeaveHistory.frame``)"""
+        with self._lock:
+            return self.history.frame(employee_ids, status, leave_type)
+
+    @metrics.instrument('service.working_days')
+    def working_days(self, start_date, end_date):
+        """Working days in ``[start_date, end_date]``, excluding weekends and holidays"""
+        return self.reference.workday_calendar.count(start_date, end_date)
+
+    @metrics.instrument('service.team_coverage', records=_department_walked)
+    def team_coverage(self, employee_id, start_date, end_date):
+        """Share of the employee's department colleagues not on approved leave, and the overlapping leaves"""
+        with self._lock:
+            emp = self.employee(employee_id)
+            team_members = self.reference.employees.in_department(emp.department, exclude=employee_id)
+            overlapping = [leave for leave in self.index.overlapping(start_date, end_date, department=emp.department)
+                           if leave.employee_id != employee_id]
+            return 1 - (len(overlapping) / max(len(team_members), 1)), overlapping
+
+    @metrics.instrument('service.team_coverage_batch', records=_requests_given)
+    def team_coverage_batch(self, requests):
+        """Team coverage for a queue of requests in one sweep, as (coverage, overlapping count) pairs"""
+        with self._lock:
+            return team_coverage_batch(requests, self.reference.employees, self.index)
+
+    @metrics.instrument('service.validate_request')
+    def validate_request(self, employee_id, leave_type, start_date, end_date):
+        """Policy errors and warnings for a prospective request"""
+        leave_days = self.working_days(start_date, end_date)
+        coverage, overlapping = self.team_coverage(employee_id, start_date, end_date)
+        return self.check_policy(employee_id, leave_type, start_date, leave_days, coverage, len(overlapping))
+
+    @metrics.instrument('service.validate_requests', records=_requests_given)
+    def validate_requests(self, requests, coverage=None):
+        """Validate a queue of requests, sharing one working-day and coverage pass"""
+        if not requests:
+            return []
+        leave_days = self.reference.workday_calendar.count_many(
+            [lr.start_date for lr in requests], [lr.end_date for lr in requests])
+        if coverage is None:
+            coverage = self.team_coverage_batch(requests)
+        return [self.check_policy(lr.employee_id, lr.leave_type, lr.start_date, int(days), cov, overlapping)
+                for lr, days, (cov, overlapping) in zip(requests, leave_days, coverage)]
+
+    def check_policy(self, employee_id, leave_type, start_date, leave_days, coverage, overlapping_count):
+        """Policy errors and warnings for a request whose working days and coverage are known"""
+        emp = self.employee(employee_id)
+        policy = self.reference.policies[emp.policy]
+
+        errors = []
+        warnings = []
+
+        days_until_leave = (start_date - datetime.now()).days
+        if days_until_leave < policy.min_notice_days:
+            warnings.append(f"Less than {policy.min_notice_days} days notice provided")
+
+        if leave_days > policy.max_consecutive_days:
+            errors.append(f"Exceeds maximum consecutive days ({policy.max_consecutive_days})")
+
+        with self._lock:
+            available = self.balances.get(employee_id, {}).get(leave_type, 0)
+        if leave_days > available:
+            errors.append(f"Insufficient {leave_type} balance (Available: {available}, Requested: {leave_days})")
+
+        if coverage < 0.5:
+            warnings.append(f"Low team coverage ({coverage*100:.0f}%) - {overlapping_count} team members also on leave")
+
+        return errors, warnings
+
+    def check_bulk_approval(self, requests, validation_results):
+        """Errors blocking approval of ``requests`` together, as (request, error) pairs.
+
+        On top of each request's own policy errors, requests for the same
+        employee and leave type must fit the balance together.
+        """
+        problems = [(lr, error) for lr, (errors, _) in zip(requests, validation_results) for error in errors]
+        groups = {}
+        for lr in requests:
+            groups.setdefault((lr.employee_id, lr.leave_type), []).append(lr)
+        with self._lock:
+            for (employee_id, leave_type), group in groups.items():
+                total = sum(lr.days for lr in group)
+                available = self.balances.get(employee_id, {}).get(leave_type, 0)
+                if len(group) > 1 and total > available:
+                    problems.append((group[0], f"Selected {leave_type} requests total {total} days "
+                                               f"(Available: {available})"))
+        return problems
+
+    @metrics.instrument('service.pending_approvals', records=_reports_walked('Pending'))
+    def pending_approvals(self, approver_id):
+        """Pending requests from the approver's direct reports, oldest first"""
+        reports = self.reference.employees.reports_to(approver_id)
+        with self._lock:
+            pending = [lr for emp in reports
+                       for lr in self.index.starting_between(datetime.min, status='Pending', employee_id=emp.id)]
+        pending.sort(key=lambda lr: lr.submitted_date)
+        return pending
+
+    @metrics.instrument('service.recent_reviews', records=_reports_walked('Approved', 'Rejected'))
+    def recent_reviews(self, approver_id, limit=5):
+        """The approver's latest decisions on their direct reports' requests, newest first"""
+        reports = self.reference.employees.reports_to(approver_id)
+        with self._lock:
+            reviewed = [lr for emp in reports for status in ('Approved', 'Rejected')
+                        for lr in self.index.starting_between(datetime.min, status=status, employee_id=emp.id)
+                        if lr.approver_id == approver_id]
+        reviewed.sort(key=lambda lr: lr.approved_date or lr.submitted_date, reverse=True)
+        return reviewed[:limit]
+
+    @metrics.instrument('service.sick_leave_pattern')
+    def sick_leave_pattern(self, employee_id):
+        """Sick-leave pattern for wellness interventions"""
+        with self._lock:
+            return self.wellness.pattern(employee_id)
+
+    def sick_leave_patterns(self, employee_ids=None):
+        """Sick-leave patterns by employee id (default: everyone with leave history)"""
+        with self._lock:
+            return self.wellness.patterns(employee_ids)
+
+    def wellness_alerts(self, min_level='yellow'):
+        """Employees at ``min_level`` or worse, most serious first, as (employee_id, pattern) pairs"""
+        with self._lock:
+            return self.wellness.alerts(min_level)
+
+    @metrics.instrument('service.absence_forecast')
+    def absence_forecast(self, today):
+        """Next quarter's weekly absence forecast for every department, rebuilt when the data changes"""
+        from lms.forecast import forecast_absences
+
+        with self._lock:
+            key = (self.revision, self.reference_version, today.date())
+            if self._forecast is None or self._forecast[0] != key:
+                forecast = forecast_absences(self.history, self.reference.employees,
+                                             self.reference.workday_calendar, today)
+                self._forecast = (key, forecast)
+            return self._forecast[1]
+
+    @metrics.instrument('service.submit_request')
+    def submit_request(self, request):
+        """Record a new leave request and return the service's copy; the store assigns its id"""
+        with self._lock:
+            self._write(self.store.insert_request, request)
+            return self.requests[request.id]
+
+    def request_leave(self, employee_id, leave_type, start_date, end_date, reason):
+        """Validate a new request and submit it unless it breaks policy.
+
+        Returns ``(request, errors, warnings)``; ``request`` is None when
+        there were errors and nothing was submitted.
+        """
+        with self._lock:
+            errors, warnings = self.validate_request(employee_id, leave_type, start_date, end_date)
+            if errors:
+                return None, errors, warnings
+            request = LeaveRequest(
+                id=None,
+                employee_id=employee_id,
+                leave_type=leave_type,
+                start_date=start_date,
+                end_date=end_date,
+                days=self.working_days(start_date, end_date),
+                reason=reason,
+                status='Pending',
+                submitted_date=datetime.now()
+            )
+            return self.submit_request(request), errors, warnings
+
+    @metrics.instrument('service.review_requests', records=_requests_given)
+    def review_requests(self, requests, status, approver_id, comments=""):
+        """Approve or reject a batch of pending requests as one transaction.
+
+        Approvals deduct from the employees' balances in the same write, and
+        nothing changes unless the store accepted the batch.  Raises
+        ``ConcurrentUpdateError`` if any request was no longer pending, e.g.
+        another manager reviewed it first; the copy has caught up with that
+        change by then.  Returns the reviewed requests.
+        """
+        with self._lock:
+            now = datetime.now()
+            reviewed = [replace(lr, status=status, approver_id=approver_id, approved_date=now, comments=comments)
+                        for lr in requests]
+            ledger_entries = []
+            if status == 'Approved':
+                for lr in requests:
+                    if lr.employee_id in self.balances:
+                        ledger_entries += usage_entries(lr.employee_id, lr.leave_type, lr.days, 'deduct', lr.id,
+                                                        lr.start_date)
+
+            self._write(self.store.review_requests, reviewed, 'Pending', ledger_entries)
+            return [self.requests[lr.id] for lr in requests]
+
+    @metrics.instrument('service.cancel_request')
+    def cancel_request(self, request):
+        """Withdraw a pending leave request; raises ``ConcurrentUpdateError`` if it was reviewed meanwhile"""
+        with self._lock:
+            self._write(self.store.delete_request, request.id)
+
+    def add_holiday(self, holiday):
+        with self._lock:
+            self._write(self.store.add_holiday, holiday)
+
+    def delete_holiday(self, holiday):
+        with self._lock:
+            self._write(self.store.delete_holiday, holiday['date'])
+
+    def save_policy(self, policy):
+        with self._lock:
+            self._write(self.store.save_policy, policy)
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_service(store):
+    """Process-wide service for ``store``, shared by every session and the API"""
+    with _services_lock:
+        service = _services.get(store.path)
+        if service is None:
+            service = _services[store.path] = LeaveService(store)
+        return service
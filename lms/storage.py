@@ -0,0 +1,620 @@
+"""SQLite persistence for policies, employees, leave requests, balances and holidays."""
+
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from lms.models import Employee, LeavePolicy, LeaveRequest
+
+DEFAULT_DB_PATH = os.environ.get('LMS_DB_PATH', 'leave_management.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leave_policies (
+    name TEXT PRIMARY KEY,
+    annual_days INTEGER NOT NULL,
+    sick_days INTEGER NOT NULL,
+    personal_days INTEGER NOT NULL,
+    carryover_limit INTEGER NOT NULL,
+    max_consecutive_days INTEGER NOT NULL,
+    min_notice_days INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS employees (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    department TEXT NOT NULL,
+    manager_id TEXT,
+    policy TEXT NOT NULL REFERENCES leave_policies(name),
+    hire_date TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS leave_requests (
+    id TEXT PRIMARY KEY,
+    employee_id TEXT NOT NULL REFERENCES employees(id),
+    leave_type TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    days NUMERIC NOT NULL,
+    reason TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submitted_date TEXT NOT NULL,
+    approver_id TEXT,
+    approved_date TEXT,
+    comments TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_requests_employee ON leave_requests(employee_id, submitted_date);
+CREATE INDEX IF NOT EXISTS idx_requests_status ON leave_requests(status);
+CREATE INDEX IF NOT EXISTS idx_requests_start ON leave_requests(start_date);
+CREATE INDEX IF NOT EXISTS idx_requests_end ON leave_requests(end_date);
+
+-- Snapshot of every balance as of ledger entry meta.snapshot_seq
+CREATE TABLE IF NOT EXISTS leave_balances (
+    employee_id TEXT NOT NULL REFERENCES employees(id),
+    bucket TEXT NOT NULL,
+    days NUMERIC NOT NULL,
+    PRIMARY KEY (employee_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS balance_ledger (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id TEXT NOT NULL REFERENCES employees(id),
+    bucket TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('grant', 'accrue', 'deduct', 'restore', 'carryover', 'expire')),
+    days NUMERIC NOT NULL,
+    request_id TEXT,
+    effective_date TEXT,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ledger_employee ON balance_ledger(employee_id, seq);
+CREATE INDEX IF NOT EXISTS idx_ledger_effective ON balance_ledger(kind, effective_date);
+
+-- Ids of the requests each write touched, so in-memory copies can catch up without a
+-- full reload; a NULL id means any request may have changed (bulk loads)
+CREATE TABLE IF NOT EXISTS request_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS holidays (
+    date TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta VALUES ('reference_version', 1);
+INSERT OR IGNORE INTO meta VALUES ('request_sequence', 0);
+INSERT OR IGNORE INTO meta VALUES ('snapshot_seq', 0);
+"""
+
+# Statements are kept as module constants so sqlite3's per-connection
+# statement cache reuses the compiled form on every call.
+SELECT_POLICIES = "SELECT * FROM leave_policies ORDER BY rowid"
+SELECT_EMPLOYEES = "SELECT * FROM employees ORDER BY rowid"
+SELECT_REQUESTS = "SELECT * FROM leave_requests ORDER BY rowid"
+SELECT_REQUESTS_BY_ID = "SELECT * FROM leave_requests WHERE id IN ({ids})"
+LOG_REQUEST_CHANGE = "INSERT INTO request_log (request_id) VALUES (?)"
+SELECT_CHANGE_POSITION = """
+    SELECT (SELECT COALESCE(MAX(seq), 0) FROM request_log), (SELECT COALESCE(MAX(seq), 0) FROM balance_ledger)
+"""
+SELECT_REQUEST_LOG = "SELECT request_id FROM request_log WHERE seq > ? AND seq <= ?"
+SELECT_REQUEST_LOG_START = "SELECT MIN(seq) FROM request_log"
+SELECT_LEDGER_CHANGES = "SELECT DISTINCT employee_id FROM balance_ledger WHERE seq > ? AND seq <= ?"
+# The request log keeps this many latest entries; readers further behind reload in full
+REQUEST_LOG_SIZE = 100000
+TRIM_REQUEST_LOG = "DELETE FROM request_log WHERE seq <= (SELECT MAX(seq) FROM request_log) - ?"
+# Ids per IN (...) list, well inside SQLite's limit on bound parameters
+ID_BATCH_SIZE = 500
+# Current balances: the snapshot plus the ledger entries recorded after it, rounded to
+# hundredths so fractional accruals do not leave float noise behind
+SELECT_BALANCES = """
+    SELECT employee_id, bucket, ROUND(SUM(days), 2) FROM (
+        SELECT employee_id, bucket, days FROM leave_balances WHERE {where}
+        UNION ALL
+        SELECT employee_id, bucket, days FROM balance_ledger
+        WHERE seq > (SELECT value FROM meta WHERE key = 'snapshot_seq') AND {where}
+    )
+    GROUP BY employee_id, bucket
+"""
+SELECT_HOLIDAYS = "SELECT date, name FROM holidays ORDER BY rowid"
+INSERT_POLICY = """
+    INSERT INTO leave_policies VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (name) DO UPDATE SET
+        annual_days = excluded.annual_days, sick_days = excluded.sick_days,
+        personal_days = excluded.personal_days, carryover_limit = excluded.carryover_limit,
+        max_consecutive_days = excluded.max_consecutive_days, min_notice_days = excluded.min_notice_days
+"""
+INSERT_EMPLOYEE = "INSERT OR REPLACE INTO employees VALUES (?, ?, ?, ?, ?, ?, ?)"
+INSERT_REQUEST = "INSERT INTO leave_requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+UPDATE_REQUEST = """
+    UPDATE leave_requests
+    SET leave_type = ?, start_date = ?, end_date = ?, days = ?, reason = ?, status = ?,
+        approver_id = ?, approved_date = ?, comments = ?
+    WHERE id = ?
+"""
+REVIEW_REQUEST = """
+    UPDATE leave_requests SET status = ?, approver_id = ?, approved_date = ?, comments = ?
+    WHERE id = ? AND status = ?
+"""
+DELETE_REQUEST = "DELETE FROM leave_requests WHERE id = ? AND status = ?"
+SELECT_LEAVE_DATE_RANGE = """
+    SELECT (SELECT MIN(start_date) FROM leave_requests), (SELECT MAX(end_date) FROM leave_requests)
+"""
+SELECT_REQUEST_YEARS = """
+    SELECT DISTINCT CAST(SUBSTR(start_date, 1, 4) AS INTEGER) FROM leave_requests
+    WHERE employee_id = ? ORDER BY 1 DESC
+"""
+# Dates are cut to YYYY-MM-DD in SQL so exports never format rows in Python
+SELECT_REPORT = """
+    SELECT r.id, e.name, e.department, r.leave_type, SUBSTR(r.start_date, 1, 10),
+           SUBSTR(r.end_date, 1, 10), r.days, r.status, SUBSTR(r.submitted_date, 1, 10)
+    FROM leave_requests r JOIN employees e ON e.id = r.employee_id
+"""
+# The request sequence only moves forward, so ids of cancelled requests are never reused
+SYNC_REQUEST_SEQUENCE = """
+    UPDATE meta SET value = MAX(value, (SELECT COALESCE(MAX(CAST(SUBSTR(id, 2) AS INTEGER)), 0)
+                                        FROM leave_requests WHERE id LIKE 'L%'))
+    WHERE key = 'request_sequence'
+"""
+BUMP_REQUEST_SEQUENCE = "UPDATE meta SET value = value + 1 WHERE key = 'request_sequence'"
+SELECT_REQUEST_SEQUENCE = "SELECT value FROM meta WHERE key = 'request_sequence'"
+INSERT_LEDGER_ENTRY = """
+    INSERT INTO balance_ledger (employee_id, bucket, kind, days, request_id, effective_date, recorded_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+SELECT_LEDGER = """
+    SELECT seq, bucket, kind, days, request_id, effective_date, recorded_at FROM balance_ledger
+    WHERE employee_id = ? ORDER BY seq DESC LIMIT ?
+"""
+SELECT_ENTITLEMENTS = """
+    SELECT employee_id, SUM(CASE WHEN bucket = ? THEN days ELSE 0 END) FROM balance_ledger
+    WHERE kind IN ('grant', 'accrue') AND effective_date >= ? AND effective_date < ?
+    GROUP BY employee_id
+"""
+SELECT_LEDGER_FROM = """
+    SELECT employee_id, bucket, ROUND(SUM(days), 2) FROM balance_ledger
+    WHERE effective_date >= ?
+    GROUP BY employee_id, bucket
+"""
+SELECT_CLOSED_EMPLOYEES = """
+    SELECT DISTINCT employee_id FROM balance_ledger
+    WHERE kind IN ('carryover', 'expire') AND effective_date >= ? AND effective_date < ?
+"""
+SELECT_LEDGER_TAIL = """
+    SELECT COUNT(*) FROM balance_ledger WHERE seq > (SELECT value FROM meta WHERE key = 'snapshot_seq')
+"""
+# Rolls the snapshot forward over the tail, then moves the snapshot marker.  NOT INDEXED
+# keeps SQLite from walking the whole ledger in employee order instead of seeking to the tail.
+ROLL_SNAPSHOT_FORWARD = """
+    INSERT INTO leave_balances (employee_id, bucket, days)
+    SELECT employee_id, bucket, SUM(days) FROM balance_ledger NOT INDEXED
+    WHERE seq > (SELECT value FROM meta WHERE key = 'snapshot_seq')
+    GROUP BY employee_id, bucket
+    ON CONFLICT (employee_id, bucket) DO UPDATE SET days = ROUND(days + excluded.days, 2)
+"""
+MOVE_SNAPSHOT_MARKER = """
+    UPDATE meta SET value = (SELECT COALESCE(MAX(seq), 0) FROM balance_ledger) WHERE key = 'snapshot_seq'
+"""
+# Snapshots are taken once this many ledger entries have built up after the last one
+SNAPSHOT_INTERVAL = 1000
+INSERT_HOLIDAY = "INSERT OR REPLACE INTO holidays VALUES (?, ?)"
+DELETE_HOLIDAY = "DELETE FROM holidays WHERE date = ?"
+SELECT_REFERENCE_VERSION = "SELECT value FROM meta WHERE key = 'reference_version'"
+BUMP_REFERENCE_VERSION = "UPDATE meta SET value = value + 1 WHERE key = 'reference_version'"
+
+
+def _to_text(value):
+    return value.isoformat(sep=' ') if value is not None else None
+
+def _to_datetime(value):
+    return datetime.fromisoformat(value) if value is not None else None
+
+def _policy_params(policy):
+    return (policy.name, policy.annual_days, policy.sick_days, policy.personal_days,
+            policy.carryover_limit, policy.max_consecutive_days, policy.min_notice_days)
+
+def _request_from_row(row):
+    # Interned so the many requests per employee, type and status share one string each
+    return LeaveRequest(
+        id=row['id'],
+        employee_id=sys.intern(row['employee_id']),
+        leave_type=sys.intern(row['leave_type']),
+        start_date=_to_datetime(row['start_date']),
+        end_date=_to_datetime(row['end_date']),
+        days=row['days'],
+        reason=row['reason'],
+        status=sys.intern(row['status']),
+        submitted_date=_to_datetime(row['submitted_date']),
+        approver_id=row['approver_id'] and sys.intern(row['approver_id']),
+        approved_date=_to_datetime(row['approved_date']),
+        comments=row['comments'],
+    )
+
+def _request_filter(employee_id, statuses, leave_types, year):
+    """WHERE clause and params for one employee's requests matching the filters.
+
+    The year bounds are compared as ISO text so the query can use the
+    ``(employee_id, submitted_date)`` index and a range on ``start_date``.
+    """
+    clause = (f"employee_id = ? AND status IN ({', '.join('?' * len(statuses))})"
+              f" AND leave_type IN ({', '.join('?' * len(leave_types))})")
+    params = [employee_id, *statuses, *leave_types]
+    if year is not None:
+        clause += " AND start_date >= ? AND start_date < ?"
+        params += [f"{year:04d}-01-01", f"{year + 1:04d}-01-01"]
+    return clause, params
+
+def _request_params(request):
+    return (request.id, request.employee_id, request.leave_type,
+            _to_text(request.start_date), _to_text(request.end_date), request.days,
+            request.reason, request.status, _to_text(request.submitted_date),
+            request.approver_id, _to_text(request.approved_date), request.comments or "")
+
+def _update_params(request):
+    params = _request_params(request)
+    return params[2:8] + params[9:] + params[:1]
+
+
+def _ledger_statements(entries):
+    recorded_at = _to_text(datetime.now())
+    return [(INSERT_LEDGER_ENTRY, (e.employee_id, e.bucket, e.kind, e.days, e.request_id,
+                                   _to_text(e.effective_date), recorded_at))
+            for e in entries]
+
+
+class ConcurrentUpdateError(Exception):
+    """A request changed in the store since the caller loaded it"""
+
+
+class LeaveStore:
+    """SQLite-backed store running in WAL mode on a single shared connection.
+
+    One store is meant to be shared by every session in the process (see
+    ``get_store``); a lock serialises access to the connection.  Every write
+    bumps ``revision`` so holders of in-memory copies can tell when to catch
+    up, and commits made through other connections are picked up via
+    ``PRAGMA data_version``.  ``changes_since`` then says which requests and
+    balances changed: request writes are logged in ``request_log`` and the
+    balance ledger is append-only.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(SYNC_REQUEST_SEQUENCE)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @property
+    def revision(self):
+        """Changes whenever the data changes, through this store or another connection"""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return (data_version, self._writes)
+
+    def _write(self, statements, many=False):
+        """Run (sql, params) pairs in one transaction.
+
+        A statement given as ``(sql, params, True)`` must change at least one
+        row; otherwise the whole transaction is rolled back and
+        ``ConcurrentUpdateError`` raised.  With ``many``, each params is a
+        sequence of parameter rows run through ``executemany``.  Returns the
+        revisions immediately before and after the write, so a caller whose
+        copy was current before can stay current without a reload.
+        """
+        execute = self._conn.executemany if many else self._conn.execute
+        with self._lock:
+            before = self.revision
+            with self._conn:
+                for sql, params, *checked in statements:
+                    if execute(sql, params).rowcount == 0 and checked:
+                        raise ConcurrentUpdateError(f"Expected a row to change: {' '.join(sql.split())[:60]}")
+            self._writes += 1
+            return before, (before[0], self._writes)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def is_empty(self):
+        return not self._query("SELECT 1 FROM employees LIMIT 1")
+
+    def seed(self, policies, employees, requests, holidays):
+        """Populate the database in a single transaction, unless it already has data"""
+        with self._lock:
+            if not self.is_empty():
+                return None
+            return self._seed(policies, employees, requests, holidays)
+
+    def _seed(self, policies, employees, requests, holidays):
+        statements = [(INSERT_POLICY, _policy_params(p)) for p in policies.values()]
+        statements += [(INSERT_EMPLOYEE, (e.id, e.name, e.email, e.department, e.manager_id,
+                                          e.policy, _to_text(e.hire_date)))
+                       for e in employees]
+        statements += [(INSERT_REQUEST, _request_params(r)) for r in requests]
+        statements += [(INSERT_HOLIDAY, (_to_text(h['date']), h['name'])) for h in holidays]
+        statements.append((SYNC_REQUEST_SEQUENCE, ()))
+        statements.append((LOG_REQUEST_CHANGE, (None,)))
+        return self._write(statements)
+
+    def load_policies(self):
+        return {row['name']: LeavePolicy(*tuple(row)) for row in self._query(SELECT_POLICIES)}
+
+    def load_employees(self):
+        return [Employee(*tuple(row)[:6], hire_date=_to_datetime(row['hire_date']))
+                for row in self._query(SELECT_EMPLOYEES)]
+
+    def load_leave_requests(self):
+        return [_request_from_row(row) for row in self._query(SELECT_REQUESTS)]
+
+    def load_requests(self, request_ids):
+        """The stored requests among ``request_ids``; ids no longer stored are left out"""
+        request_ids = list(request_ids)
+        requests = []
+        for start in range(0, len(request_ids), ID_BATCH_SIZE):
+            batch = request_ids[start:start + ID_BATCH_SIZE]
+            rows = self._query(SELECT_REQUESTS_BY_ID.format(ids=', '.join('?' * len(batch))), batch)
+            requests += [_request_from_row(row) for row in rows]
+        return requests
+
+    def change_position(self):
+        """Position in the request log and balance ledger, for ``changes_since``"""
+        return tuple(self._query(SELECT_CHANGE_POSITION)[0])
+
+    def changes_since(self, position):
+        """What changed after ``position``: ``(new position, request ids, employee ids)``.
+
+        The request ids are the requests added, changed or deleted; they are
+        None when the log cannot tell (a bulk load, or entries trimmed since
+        ``position``) and everything must be reloaded.  The employee ids are
+        those whose balances changed.
+        """
+        request_seq, ledger_seq = position
+        with self._lock:
+            current = self.change_position()
+            rows = self._query(SELECT_REQUEST_LOG, (request_seq, current[0]))
+            first = self._query(SELECT_REQUEST_LOG_START)[0][0]
+            request_ids = {row[0] for row in rows}
+            if None in request_ids or (first is not None and first > request_seq + 1):
+                request_ids = None
+            employee_ids = {row[0] for row in self._query(SELECT_LEDGER_CHANGES, (ledger_seq, current[1]))}
+            return current, request_ids, employee_ids
+
+    def load_holidays(self):
+        return [{'date': _to_datetime(row['date']), 'name': row['name']}
+                for row in self._query(SELECT_HOLIDAYS)]
+
+    def load_balances(self, employee_ids=None):
+        """Current balances by employee and bucket, from the latest snapshot plus the ledger tail"""
+        if employee_ids is None:
+            sql, params = SELECT_BALANCES.format(where="1"), ()
+        else:
+            employee_ids = tuple(employee_ids)
+            where = f"employee_id IN ({', '.join('?' * len(employee_ids))})"
+            sql, params = SELECT_BALANCES.format(where=where), employee_ids * 2
+        balances = {}
+        for employee_id, bucket, days in self._query(sql, params):
+            balances.setdefault(employee_id, {})[bucket] = days
+        return balances
+
+    def ledger(self, employee_id, limit=100):
+        """An employee's most recent ledger entries, newest first"""
+        return [dict(row) for row in self._query(SELECT_LEDGER, (employee_id, limit))]
+
+    def leave_date_range(self):
+        """Earliest start and latest end over all leave requests, or (None, None)"""
+        first, last = self._query(SELECT_LEAVE_DATE_RANGE)[0]
+        return _to_datetime(first), _to_datetime(last)
+
+    def request_years(self, employee_id):
+        """Years in which an employee's leave requests start, newest first"""
+        return [row[0] for row in self._query(SELECT_REQUEST_YEARS, (employee_id,))]
+
+    def request_summary(self, employee_id, statuses, leave_types, year=None):
+        """Totals over every request matching the filters, not just one page.
+
+        Returns a dict with ``total``, ``pending``, ``approved`` and
+        ``approved_days``.
+        """
+        clause, params = _request_filter(employee_id, statuses, leave_types, year)
+        row = self._query(f"""
+            SELECT COUNT(*), COALESCE(SUM(status = 'Pending'), 0), COALESCE(SUM(status = 'Approved'), 0),
+                   COALESCE(SUM(CASE WHEN status = 'Approved' THEN days END), 0)
+            FROM leave_requests WHERE {clause}
+        """, params)[0]
+        return dict(zip(('total', 'pending', 'approved', 'approved_days'), tuple(row)))
+
+    def page_requests(self, employee_id, statuses, leave_types, year=None, limit=10, offset=0):
+        """One page of an employee's requests matching the filters, newest submission first.
+
+        Ties on ``submitted_date`` are broken by id so pages never overlap
+        or skip rows.
+        """
+        clause, params = _request_filter(employee_id, statuses, leave_types, year)
+        rows = self._query(f"""
+            SELECT * FROM leave_requests WHERE {clause}
+            ORDER BY submitted_date DESC, id DESC LIMIT ? OFFSET ?
+        """, [*params, limit, offset])
+        return [_request_from_row(row) for row in rows]
+
+    def iter_report_rows(self, employee_ids=None, department=None, start=None, end=None,
+                         batch_size=5000):
+        """Report rows as tuples, in batches of at most ``batch_size``, ordered by start date.
+
+        Filters combine: requests by ``employee_ids``, by employees of
+        ``department``, and/or overlapping ``[start, end]``.  Reads go
+        through a dedicated read-only connection, so a long export sees one
+        consistent snapshot (WAL) without holding the shared connection's
+        lock between batches.
+        """
+        clauses, params = [], []
+        if employee_ids is not None:
+            employee_ids = list(employee_ids)
+            clauses.append(f"r.employee_id IN ({', '.join('?' * len(employee_ids))})")
+            params += employee_ids
+        if department is not None:
+            clauses.append("e.department = ?")
+            params.append(department)
+        if start is not None:
+            clauses.append("r.end_date >= ?")
+            params.append(_to_text(start))
+        if end is not None:
+            clauses.append("r.start_date <= ?")
+            params.append(_to_text(end))
+        sql = SELECT_REPORT
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY r.start_date, r.id"
+
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def insert_request(self, request):
+        """Store a new request under the next id from the request sequence.
+
+        The id is allocated and the row inserted in one transaction, so
+        concurrent sessions never see the same id; ``request.id`` is set
+        on success.
+        """
+        with self._lock:
+            before = self.revision
+            with self._conn:
+                self._conn.execute(BUMP_REQUEST_SEQUENCE)
+                number = self._conn.execute(SELECT_REQUEST_SEQUENCE).fetchone()[0]
+                request.id = f"L{number:03d}"
+                self._conn.execute(INSERT_REQUEST, _request_params(request))
+                self._conn.execute(LOG_REQUEST_CHANGE, (request.id,))
+            self._writes += 1
+            return before, (before[0], self._writes)
+
+    def update_request(self, request):
+        return self._write([(UPDATE_REQUEST, _update_params(request)), (LOG_REQUEST_CHANGE, (request.id,))])
+
+    def review_requests(self, requests, expected_status, ledger_entries):
+        """Move requests out of ``expected_status`` and record ledger entries, all or nothing.
+
+        Each transition only applies if the stored status still equals
+        ``expected_status``, so of two reviewers racing on the same request
+        exactly one succeeds; the other gets ``ConcurrentUpdateError`` and
+        nothing of their batch is written.  Balances only ever change by
+        appending entries, so a stale in-memory balance can never overwrite
+        a newer one.
+        """
+        statements = []
+        for r in requests:
+            statements.append((REVIEW_REQUEST, (r.status, r.approver_id, _to_text(r.approved_date), r.comments,
+                                                r.id, expected_status), True))
+            statements.append((LOG_REQUEST_CHANGE, (r.id,)))
+        return self._append_ledger(statements + _ledger_statements(ledger_entries))
+
+    def delete_request(self, request_id, expected_status='Pending'):
+        """Delete a request, only while its stored status is still ``expected_status``"""
+        return self._write([(DELETE_REQUEST, (request_id, expected_status), True),
+                            (LOG_REQUEST_CHANGE, (request_id,))])
+
+    def entitlements(self, bucket, start, end):
+        """Days of ``bucket`` granted or accrued by entries effective in ``[start, end)``, by employee.
+
+        Every employee with a grant or accrual in the period is included,
+        at zero if none of it went to ``bucket``.
+        """
+        return dict(self._query(SELECT_ENTITLEMENTS, (bucket, _to_text(start), _to_text(end))))
+
+    def balances_from(self, start):
+        """Sums of the ledger entries effective on or after ``start``, by employee and bucket"""
+        totals = {}
+        for employee_id, bucket, days in self._query(SELECT_LEDGER_FROM, (_to_text(start),)):
+            totals.setdefault(employee_id, {})[bucket] = days
+        return totals
+
+    def closed_employees(self, year):
+        """Employees whose ``year`` has been closed, i.e. who have year-end entries effective on the next January 1"""
+        start = datetime(year + 1, 1, 1)
+        return {emp_id for emp_id, in self._query(SELECT_CLOSED_EMPLOYEES,
+                                                   (_to_text(start), _to_text(start + timedelta(days=1))))}
+
+    def append_ledger(self, entries):
+        """Record balance changes (a list of ``LedgerEntry``) in one transaction"""
+        return self._append_ledger(_ledger_statements(entries))
+
+    def append_ledger_rows(self, rows):
+        """Bulk ``append_ledger`` for batch jobs, in one transaction.
+
+        ``rows`` are ``(employee_id, bucket, kind, days, request_id,
+        effective_date)`` tuples, inserted with a single ``executemany``.
+        """
+        recorded_at = _to_text(datetime.now())
+        # Batches share a handful of effective dates, so each is formatted once
+        dates = {date: _to_text(date) for date in {row[5] for row in rows}}
+        params = [(*row[:5], dates[row[5]], recorded_at) for row in rows]
+        return self._append_ledger([(INSERT_LEDGER_ENTRY, params)], many=True)
+
+    def _append_ledger(self, statements, many=False):
+        with self._lock:
+            revisions = self._write(statements, many)
+            if self._query(SELECT_LEDGER_TAIL)[0][0] >= SNAPSHOT_INTERVAL:
+                self.snapshot()
+            return revisions
+
+    def snapshot(self):
+        """Fold the ledger tail into the balance snapshot, and trim the request log.
+
+        Balances are unchanged by this, so it does not count as a write for
+        ``revision``; loading balances afterwards only reads the snapshot.
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute(ROLL_SNAPSHOT_FORWARD)
+                self._conn.execute(MOVE_SNAPSHOT_MARKER)
+                self._conn.execute(TRIM_REQUEST_LOG, (REQUEST_LOG_SIZE,))
+
+    def reference_version(self):
+        """Bumped by every change to policies or holidays"""
+        return self._query(SELECT_REFERENCE_VERSION)[0][0]
+
+    def save_policy(self, policy):
+        return self._write([(INSERT_POLICY, _policy_params(policy)), (BUMP_REFERENCE_VERSION, ())])
+
+    def add_holiday(self, holiday):
+        return self._write([(INSERT_HOLIDAY, (_to_text(holiday['date']), holiday['name'])),
+                            (BUMP_REFERENCE_VERSION, ())])
+
+    def delete_holiday(self, date):
+        return self._write([(DELETE_HOLIDAY, (_to_text(date),)),
+                            (BUMP_REFERENCE_VERSION, ())])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=DEFAULT_DB_PATH):
+    """Process-wide store for ``path``, opened on first use"""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = LeaveStore(path)
+        return store
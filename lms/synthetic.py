@@ -0,0 +1,133 @@
+"""Synthetic workforces of any size, for load testing and benchmarks."""
+
+import math
+from datetime import datetime
+
+import numpy as np
+
+from lms.demo_data import demo_policies
+from lms.models import Employee, LeaveRequest
+from lms.workdays import WorkdayCalendar
+
+DEFAULT_LEAVE_MIX = {'Annual Leave': 0.6, 'Sick Leave': 0.3, 'Personal Leave': 0.1}
+
+# Calendar-day length of a leave is drawn uniformly from [low, high]
+LEAVE_LENGTHS = {'Annual Leave': (1, 12), 'Sick Leave': (1, 4), 'Personal Leave': (1, 2)}
+REASONS = {'Annual Leave': 'Vacation', 'Sick Leave': 'Unwell', 'Personal Leave': 'Personal matters'}
+
+HOLIDAYS = [((1, 1), "New Year's Day"), ((7, 4), "Independence Day"), ((12, 25), "Christmas Day")]
+
+
+def _ids(prefix, count):
+    width = max(3, len(str(count)))
+    return [f"{prefix}{i:0{width}d}" for i in range(1, count + 1)]
+
+
+def _to_datetimes(days):
+    return days.astype('datetime64[s]').astype(object).tolist()
+
+
+def _managers(staff, levels, team_size):
+    """Managers per level for ``staff`` people, bottom level first, at most ``team_size`` reports each"""
+    counts = []
+    below = staff
+    for _ in range(levels):
+        below = max(math.ceil(below / team_size), 1)
+        counts.append(below)
+    return counts
+
+
+def generate_workforce(employees=1000, departments=10, manager_depth=3, team_size=8, years=3,
+                       leaves_per_year=4, leave_mix=None, today=None, seed=0):
+    """A made-up company as ``(policies, employees, requests, holidays)``, ready for ``LeaveStore.seed``.
+
+    ``employees`` staff are split evenly across ``departments``, each
+    department run by ``manager_depth`` levels of managers giving every
+    team at most ``team_size`` direct reports; the managers come on top of
+    the staff and the top level reports to the CEO.  Everyone averages
+    ``leaves_per_year`` requests a year over the last ``years`` years plus
+    the coming quarter, by leave type in the proportions of ``leave_mix``.
+    Past leave is mostly approved; upcoming leave is partly still pending.
+    The same ``seed`` always gives the same company.
+    """
+    rng = np.random.default_rng(seed)
+    today = np.datetime64((today or datetime.now()).date(), 'D')
+    leave_mix = leave_mix or DEFAULT_LEAVE_MIX
+    policies = demo_policies()
+
+    staff_ids = _ids('E', employees)
+    department_names = [f"Department {d + 1}" for d in range(max(min(departments, employees), 1))]
+    staff_departments = np.arange(employees) % len(department_names)
+
+    people = []  # (manager, department, their manager) as positions in the manager list
+    manager_count = 0
+    staff_managers = [None] * employees
+    for d, department in enumerate(department_names):
+        members = np.flatnonzero(staff_departments == d)
+        levels = []
+        for count in _managers(len(members), manager_depth, team_size):
+            levels.append(list(range(manager_count, manager_count + count)))
+            manager_count += count
+        for position, member in enumerate(members):
+            staff_managers[member] = levels[0][position * len(levels[0]) // len(members)]
+        for level, managers in enumerate(levels):
+            above = levels[level + 1] if level + 1 < len(levels) else None
+            for position, manager in enumerate(managers):
+                boss = above[position * len(above) // len(managers)] if above else None
+                people.append((manager, department, boss))
+    manager_ids = _ids('M', manager_count)
+
+    hire_dates = _to_datetimes(today - rng.integers(0, 15 * 365, size=manager_count + employees))
+    directory = []
+    for manager, department, boss in sorted(people):
+        directory.append(Employee(manager_ids[manager], f"Manager {manager + 1}",
+                                  f"{manager_ids[manager].lower()}@example.com", department,
+                                  manager_ids[boss] if boss is not None else 'CEO', 'Executive',
+                                  hire_dates[manager]))
+    staff_policies = np.where(rng.random(employees) < 0.7, 'Standard', 'Senior')
+    for i, emp_id in enumerate(staff_ids):
+        directory.append(Employee(emp_id, f"Employee {i + 1}", f"{emp_id.lower()}@example.com",
+                                  department_names[staff_departments[i]], manager_ids[staff_managers[i]],
+                                  str(staff_policies[i]), hire_dates[manager_count + i]))
+
+    first_year = int(str(today)[:4]) - years + 1
+    holidays = [{'date': datetime(year, month, day), 'name': name}
+                for year in range(first_year, first_year + years + 1) for (month, day), name in HOLIDAYS]
+
+    # Leave requests, drawn for every person at once
+    window_start = np.datetime64(f'{first_year:04d}-01-01')
+    window_end = today + 90
+    owners = np.repeat(np.arange(len(directory)), rng.poisson(leaves_per_year * years, size=len(directory)))
+    person_hired = np.array([emp.hire_date for emp in directory], dtype='datetime64[D]')[owners]
+    earliest = np.maximum(person_hired, window_start)
+    span = np.maximum((window_end - earliest).astype(np.int64), 1)
+    starts = earliest + (rng.random(len(owners)) * span).astype(np.int64)
+    leave_types = np.array(list(leave_mix))
+    weights = np.array(list(leave_mix.values()), dtype=np.float64)
+    types = rng.choice(len(leave_types), size=len(owners), p=weights / weights.sum())
+    lows = np.array([LEAVE_LENGTHS[t][0] for t in leave_types])[types]
+    highs = np.array([LEAVE_LENGTHS[t][1] for t in leave_types])[types]
+    ends = starts + rng.integers(lows, highs + 1) - 1
+    days = WorkdayCalendar(h['date'] for h in holidays).count_many(starts, ends)
+    submitted = starts - rng.integers(1, 31, size=len(owners))
+    draw = rng.random(len(owners))
+    upcoming = starts > today
+    statuses = np.where(upcoming, np.where(draw < 0.3, 'Pending', np.where(draw < 0.95, 'Approved', 'Rejected')),
+                        np.where(draw < 0.92, 'Approved', 'Rejected'))
+
+    order = np.argsort(submitted, kind='stable')
+    request_ids = _ids('L', len(owners))
+    start_dates, end_dates = _to_datetimes(starts[order]), _to_datetimes(ends[order])
+    submitted_dates = _to_datetimes(submitted[order])
+    approved_dates = _to_datetimes(submitted[order] + 1)
+    requests = []
+    for n, i in enumerate(order.tolist()):
+        emp = directory[owners[i]]
+        leave_type = str(leave_types[types[i]])
+        status = str(statuses[i])
+        reviewed = status != 'Pending'
+        requests.append(LeaveRequest(
+            request_ids[n], emp.id, leave_type, start_dates[n], end_dates[n], int(days[i]),
+            REASONS.get(leave_type, leave_type), status, submitted_dates[n],
+            emp.manager_id if reviewed else None, approved_dates[n] if reviewed else None))
+    return policies, directory, requests, holidays
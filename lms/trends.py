@@ -0,0 +1,70 @@
+"""Monthly leave usage trends, with leaves split across months by working day."""
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ['Annual', 'Sick', 'Personal']
+
+
+def leave_categories(leaves):
+    """Short category ('Annual', 'Sick', ...) of each leave in a history frame"""
+    return leaves['leave_type'].cat.rename_categories(lambda leave_type: leave_type.split()[0])
+
+
+def split_by_month(leaves, workday_calendar):
+    """One row per leave and calendar month it touches.
+
+    A leave's days are shared between its months in proportion to the
+    working days falling in each, so a leave from 28 March to 8 April counts
+    partly in March and partly in April.  A leave with no working days at
+    all (say, entirely on a holiday) stays in its start month.  Returns
+    ``position`` (row of ``leaves``), ``Month`` (first day of the month) and
+    ``days``.
+    """
+    starts = leaves['start_date'].to_numpy(dtype='datetime64[D]')
+    ends = leaves['end_date'].to_numpy(dtype='datetime64[D]')
+    first_months = starts.astype('datetime64[M]')
+    spans = (ends.astype('datetime64[M]') - first_months).astype(np.int64) + 1
+
+    position = np.repeat(np.arange(len(leaves)), spans)
+    offset = np.arange(len(position)) - np.repeat(np.cumsum(spans) - spans, spans)
+    months = first_months[position] + offset
+    segment_starts = np.maximum(starts[position], months.astype('datetime64[D]'))
+    segment_ends = np.minimum(ends[position], (months + 1).astype('datetime64[D]') - 1)
+
+    workdays = workday_calendar.count_many(segment_starts, segment_ends).astype(np.float64)
+    totals = np.bincount(position, weights=workdays, minlength=len(leaves))[position]
+    share = np.divide(workdays, totals, out=(offset == 0).astype(np.float64), where=totals > 0)
+    return pd.DataFrame({
+        'position': position,
+        'Month': months.astype('datetime64[s]'),
+        'days': leaves['days'].to_numpy()[position] * share,
+    })
+
+
+def monthly_usage(leaves, workday_calendar, by=None):
+    """Days of leave per month and category, from a history frame.
+
+    Returns a frame indexed by month start (every month in the range, zeros
+    included) with one column per category.  ``by`` -- an array aligned with
+    ``leaves``, e.g. each leave's department -- adds an outer index level
+    with one trend per group.
+    """
+    segments = split_by_month(leaves, workday_calendar)
+    segments['category'] = leave_categories(leaves).to_numpy()[segments['position']]
+    keys = ['Month', 'category']
+    if by is not None:
+        segments['group'] = np.asarray(by)[segments['position']]
+        keys.insert(0, 'group')
+    usage = segments.groupby(keys, observed=True)['days'].sum().unstack('category', fill_value=0)
+    usage = usage.reindex(columns=CATEGORIES, fill_value=0)
+    usage.columns.name = None
+
+    if segments.empty:
+        months = pd.DatetimeIndex([], name='Month')
+    else:
+        months = pd.date_range(segments['Month'].min(), segments['Month'].max(), freq='MS', name='Month')
+    if by is None:
+        return usage.reindex(months, fill_value=0)
+    groups = usage.index.unique('group').sort_values()
+    return usage.reindex(pd.MultiIndex.from_product([groups, months]), fill_value=0)
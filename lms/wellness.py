@@ -0,0 +1,80 @@
+"""Sick-leave pattern analysis for wellness interventions, batched and cached."""
+
+import numpy as np
+
+NO_PATTERN = {'total_days': 0, 'frequency': 0, 'pattern': 'No pattern', 'alert_level': 'green'}
+
+
+class WellnessAnalyzer:
+    """Sick-leave patterns per employee, computed in grouped passes over a ``LeaveHistory``.
+
+    Every sick leave counts, whatever its status.  An employee is ``red``
+    above 8 sick days, ``yellow`` above 5 or when more than 60% of their
+    sick leaves start on a Monday or Friday, and ``green`` otherwise.
+    Results are cached per employee; the ``add`` / ``reindex`` / ``remove``
+    calls made alongside the history's only drop the employee whose sick
+    leaves changed, and ``rebind`` keeps the cache across a full reload.
+    """
+
+    def __init__(self, history):
+        self._history = history
+        self._patterns = {}
+
+    def add(self, request):
+        if request.leave_type == 'Sick Leave':
+            self._patterns.pop(request.employee_id, None)
+
+    remove = reindex = add
+
+    def rebind(self, history, previous, current):
+        """Switch to a reloaded ``history``, dropping only employees whose sick leaves differ.
+
+        ``previous`` and ``current`` map request ids to the requests before
+        and after the reload.
+        """
+        self._history = history
+        for requests, others in ((previous, current), (current, previous)):
+            for request_id, request in requests.items():
+                if request.leave_type == 'Sick Leave' and others.get(request_id) != request:
+                    self._patterns.pop(request.employee_id, None)
+
+    def pattern(self, employee_id):
+        return self.patterns([employee_id])[employee_id]
+
+    def patterns(self, employee_ids=None):
+        """Patterns for ``employee_ids`` (default: everyone with leave history), by employee id"""
+        if employee_ids is None:
+            employee_ids = self._history.employee_ids()
+        missing = [emp_id for emp_id in employee_ids if emp_id not in self._patterns]
+        if missing:
+            self._patterns.update(dict.fromkeys(missing, NO_PATTERN))
+            self._patterns.update(self._analyze(missing))
+        return {emp_id: self._patterns[emp_id] for emp_id in employee_ids}
+
+    def alerts(self, min_level='yellow'):
+        """Employees at ``min_level`` or worse, most serious first, as a list of (employee_id, pattern)"""
+        levels = ['green', 'yellow', 'red']
+        flagged = [(emp_id, pattern) for emp_id, pattern in self.patterns().items()
+                   if levels.index(pattern['alert_level']) >= levels.index(min_level)]
+        flagged.sort(key=lambda item: (-levels.index(item[1]['alert_level']), -item[1]['total_days']))
+        return flagged
+
+    def _analyze(self, employee_ids):
+        leaves = self._history.columns(employee_ids, status=None, leave_type='Sick Leave')
+        if not len(leaves['days']):
+            return {}
+        employees, group = np.unique(leaves['employee_id'], return_inverse=True)
+        # 1970-01-01 was a Thursday, so Monday is 0 and Friday 4
+        weekday = (leaves['start_date'].astype(np.int64) + 3) % 7
+        total_days = np.bincount(group, weights=leaves['days'])
+        frequency = np.bincount(group)
+        edge = np.bincount(group, weights=np.isin(weekday, [0, 4]))
+        conditions = [total_days > 8, total_days > 5, edge > frequency * 0.6]
+        alert_levels = np.select(conditions, ['red', 'yellow', 'yellow'], 'green')
+        patterns = np.select(conditions, ['High frequency - wellness check recommended',
+                                          'Moderate - monitor', 'Weekend-adjacent pattern detected'], 'Normal')
+        return {
+            emp_id: {'total_days': days, 'frequency': int(count), 'pattern': pattern, 'alert_level': level}
+            for emp_id, days, count, pattern, level in zip(
+                employees.tolist(), total_days.tolist(), frequency, patterns.tolist(), alert_levels.tolist())
+        }
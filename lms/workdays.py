@@ -0,0 +1,39 @@
+"""Working-day arithmetic backed by numpy's business-day calendar."""
+
+import numpy as np
+
+WEEKMASK = '1111100'
+
+
+def to_days(dates):
+    """Convert a date, datetime or sequence of them to ``datetime64[D]``"""
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+class WorkdayCalendar:
+    """Counts Monday-Friday working days, excluding company holidays.
+
+    The holiday list is baked into a ``numpy.busdaycalendar`` once, so each
+    count is a constant-time week calculation plus a binary search over the
+    holidays.  Instances are immutable; build a new one when holidays change.
+    """
+
+    def __init__(self, holidays=()):
+        self.holidays = np.unique(to_days(list(holidays)))
+        self._busdaycal = np.busdaycalendar(weekmask=WEEKMASK, holidays=self.holidays)
+
+    def count(self, start_date, end_date):
+        """Working days from start_date to end_date, both inclusive"""
+        start, end = to_days(start_date), to_days(end_date)
+        if end < start:
+            return 0
+        return int(np.busday_count(start, end + 1, busdaycal=self._busdaycal))
+
+    def count_many(self, start_dates, end_dates):
+        """Vectorised ``count`` over parallel arrays of start and end dates"""
+        starts, ends = to_days(start_dates), to_days(end_dates)
+        counts = np.busday_count(starts, ends + 1, busdaycal=self._busdaycal)
+        return np.where(ends >= starts, counts, 0)
+
+    def is_workday(self, dates):
+        return np.is_busday(to_days(dates), busdaycal=self._busdaycal)
@@ -0,0 +1,81 @@
+from datetime import date, datetime
+
+import pytest
+
+from lms.accrual import run_accrual, run_year_end
+from lms.demo_data import seed_demo_data
+from lms.ledger import usage_entries
+from lms.storage import LeaveStore
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    stores = []
+
+    def make(name='leave'):
+        store = LeaveStore(str(tmp_path / f'{name}.db'))
+        seed_demo_data(store)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def _run(store, *jobs):
+    policies, employees = store.load_policies(), store.load_employees()
+    for job, arg in jobs:
+        if job == 'accrue':
+            run_accrual(store, policies, employees, arg)
+        else:
+            run_year_end(store, policies, employees, arg, today=date(arg + 1, 1, 2))
+    return store.load_balances()
+
+
+def test_year_end_after_next_years_accrual_matches_normal_order(make_store):
+    normal = _run(make_store('normal'), ('accrue', datetime(2026, 12, 15)), ('year-end', 2026),
+                  ('accrue', datetime(2027, 1, 2)))
+    early_store = make_store('early')
+    early = _run(early_store, ('accrue', datetime(2026, 12, 15)), ('accrue', datetime(2027, 1, 2)),
+                 ('year-end', 2026))
+    assert early == normal
+    assert 'carryover' in {entry['kind'] for entry in early_store.ledger('E001', limit=1000)}
+
+
+def test_accrual_closes_the_open_previous_year(make_store):
+    store = make_store()
+    _run(store, ('accrue', datetime(2026, 12, 15)), ('accrue', datetime(2027, 1, 2)))
+    policies, employees = store.load_policies(), store.load_employees()
+    assert store.closed_employees(2026) == {emp.id for emp in employees}
+    assert run_year_end(store, policies, employees, 2026, today=date(2027, 1, 2)) == 0
+
+
+def test_year_end_refuses_a_year_that_has_not_ended(make_store):
+    store = make_store()
+    policies, employees = store.load_policies(), store.load_employees()
+    with pytest.raises(ValueError):
+        run_year_end(store, policies, employees, 2026, today=date(2026, 10, 18))
+    assert store.closed_employees(2026) == set()
+
+
+def test_next_years_approved_leave_stays_out_of_the_closing_balance(make_store):
+    usage = usage_entries('E001', 'Annual Leave', 3, 'deduct', effective_date=datetime(2027, 1, 11))
+    balances = []
+    for name, before_close in (('before', True), ('after', False)):
+        store = make_store(name)
+        _run(store, ('accrue', datetime(2026, 12, 15)))
+        if before_close:
+            store.append_ledger(usage)
+        _run(store, ('year-end', 2026))
+        if not before_close:
+            store.append_ledger(usage)
+        balances.append(_run(store, ('accrue', datetime(2027, 1, 2))))
+    assert balances[0] == balances[1]
+
+
+def test_jobs_are_idempotent(make_store):
+    store = make_store()
+    jobs = ('accrue', datetime(2026, 12, 15)), ('year-end', 2026), ('accrue', datetime(2027, 1, 2))
+    once = _run(store, *jobs)
+    assert _run(store, *jobs) == once